@@ -8,6 +8,7 @@ from .data_models import (
     TelemetryPoint,
     Quality,
     EnergyMonitoringConfig,
+    EnergyAnalyticsConfig,
     OEEConfig,
     PredictiveMaintenanceConfig,
     AssetConfiguration,
@@ -20,6 +21,7 @@ __all__ = [
     "TelemetryPoint",
     "Quality",
     "EnergyMonitoringConfig",
+    "EnergyAnalyticsConfig",
     "OEEConfig",
     "PredictiveMaintenanceConfig",
     "AssetConfiguration",
@@ -1,7 +1,8 @@
+from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 from typing import Optional, Dict, Any, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class Quality(str, Enum):
@@ -11,23 +12,23 @@ class Quality(str, Enum):
     UNCERTAIN = "UNCERTAIN"
 
 
-class TelemetryPoint(BaseModel):
-    """Core data model for OPC UA telemetry data points"""
-    timestamp: datetime = Field(..., description="UTC timestamp of the data point")
-    enterprise: str = Field(..., description="Enterprise name (ISA-95 Level 4)")
-    site: str = Field(..., description="Site name (ISA-95 Level 3)")
-    area: str = Field(..., description="Area name (ISA-95 Level 2)")
-    line: str = Field(..., description="Production line name (ISA-95 Level 2)")
-    machine: str = Field(..., description="Machine/equipment name (ISA-95 Level 1)")
-    tag: str = Field(..., description="OPC UA tag name")
-    value: Any = Field(..., description="Tag value")
-    unit: Optional[str] = Field(None, description="Unit of measurement")
-    quality: Quality = Field(Quality.GOOD, description="Data quality status")
+@dataclass(slots=True)
+class TelemetryPoint:
+    """Core data model for OPC UA telemetry data points
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    A slotted dataclass rather than a pydantic model: one is created for every
+    data change, and the OPC UA stack has already decoded and typed the value.
+    """
+    timestamp: datetime  # UTC timestamp of the data point
+    enterprise: str  # Enterprise name (ISA-95 Level 4)
+    site: str  # Site name (ISA-95 Level 3)
+    area: str  # Area name (ISA-95 Level 2)
+    line: str  # Production line name (ISA-95 Level 2)
+    machine: str  # Machine/equipment name (ISA-95 Level 1)
+    tag: str  # OPC UA tag name
+    value: Any  # Tag value
+    unit: Optional[str] = None  # Unit of measurement
+    quality: Quality = Quality.GOOD  # Data quality status
 
 
 class EnergyMonitoringConfig(BaseModel):
@@ -39,8 +40,17 @@ class EnergyMonitoringConfig(BaseModel):
     aggregation_interval: int = Field(300, description="Aggregation interval in seconds")
 
 
+class EnergyAnalyticsConfig(BaseModel):
+    """Configuration for energy analytics use case"""
+    efficiency_tags: List[str] = Field(default_factory=list, description="Energy efficiency metric tags")
+    renewable_tags: List[str] = Field(default_factory=list, description="Renewable energy generation tags")
+    battery_tags: List[str] = Field(default_factory=list, description="Battery storage metrics tags")
+    load_tags: List[str] = Field(default_factory=list, description="Load consumption tags")
+    aggregation_interval: int = Field(300, description="Aggregation interval in seconds")
+
+
 class OEEConfig(BaseModel):
-    """Configuration for Overall Equipment Effectiveness monitoring"""
+    """Configuration for Overall Equipment Effectiveness monitoring (Legacy/Optional)"""
     availability_tags: List[str] = Field(default_factory=list, description="Machine availability status tags")
     performance_tags: List[str] = Field(default_factory=list, description="Machine performance metrics tags")
     quality_tags: List[str] = Field(default_factory=list, description="Product quality metrics tags")
@@ -59,14 +69,19 @@ class PredictiveMaintenanceConfig(BaseModel):
 
 class AssetConfiguration(BaseModel):
     """Main configuration model for assets and their use cases"""
+    # Immutable once loaded: the OPC UA client caches values derived from it per asset
+    model_config = ConfigDict(frozen=True)
+    
     asset_name: str = Field(..., description="Asset/equipment name")
     description: Optional[str] = Field(None, description="Asset description")
     opcua_endpoint: str = Field(..., description="OPC UA server endpoint URL")
     node_mapping: Dict[str, str] = Field(default_factory=dict, description="Mapping of logical names to OPC UA node IDs")
+    security_settings: Dict[str, str] = Field(default_factory=dict, description="OPC UA security settings, e.g. security_policy")
     
     # Use case configurations
     energy_monitoring: Optional[EnergyMonitoringConfig] = Field(None, description="Energy monitoring configuration")
-    oee_monitoring: Optional[OEEConfig] = Field(None, description="OEE monitoring configuration")
+    energy_analytics: Optional[EnergyAnalyticsConfig] = Field(None, description="Energy analytics configuration")
+    oee_monitoring: Optional[OEEConfig] = Field(None, description="OEE monitoring configuration (Legacy/Optional)")
     predictive_maintenance: Optional[PredictiveMaintenanceConfig] = Field(None, description="Predictive maintenance configuration")
     
     # Additional metadata
@@ -98,5 +113,7 @@ class BridgeConfiguration(BaseModel):
     def from_yaml(cls, yaml_content: str) -> "BridgeConfiguration":
         """Create configuration from YAML content"""
         import yaml
-        data = yaml.safe_load(yaml_content)
+        # libyaml-backed loader when available; the pure-Python parser is much slower on large configs
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        data = yaml.load(yaml_content, Loader=loader)
         return cls(**data)
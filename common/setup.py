@@ -1,4 +1,4 @@
-from setuptools import setup, find_packages
+from setuptools import setup
 
 setup(
     name="opcua-cloud-bridge-common",
@@ -6,8 +6,10 @@ setup(
     description="Common data models and utilities for OPC UA to Cloud Bridge",
     author="GlobalCorp",
     author_email="engineering@globalcorp.com",
-    packages=find_packages(),
-    python_requires=">=3.8",
+    # This directory is itself the "common" package
+    packages=["common"],
+    package_dir={"common": "."},
+    python_requires=">=3.10",
     install_requires=[
         "pydantic>=2.0.0",
         "PyYAML>=6.0",
@@ -26,8 +28,6 @@ setup(
         "Intended Audience :: Developers",
         "License :: OSI Approved :: MIT License",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.8",
-        "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
         "Programming Language :: Python :: 3.12",
@@ -8,12 +8,7 @@ from typing import Dict, List, Optional, Tuple, Any
 from collections import deque, defaultdict
 import numpy as np
 
-# Add parent directory to path for common models
-import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent.parent / "common"))
-
-from data_models import (
+from common.data_models import (
     TelemetryPoint, 
     Quality, 
     EnergyMonitoringConfig, 
@@ -680,6 +675,19 @@ class AnalyticsProcessor:
     
     async def process_telemetry_point(self, point: TelemetryPoint) -> Dict[str, Any]:
         """Process a single telemetry point and return analytics results"""
+        return self.analyze_point(point)
+    
+    def analyze_batch(self, points: List[TelemetryPoint]) -> List[Dict[str, Any]]:
+        """Process points in order, returning only results that carry analytics"""
+        results = []
+        for point in points:
+            result = self.analyze_point(point)
+            if result['analytics']:
+                results.append(result)
+        return results
+    
+    def analyze_point(self, point: TelemetryPoint) -> Dict[str, Any]:
+        """Synchronous analytics for a single point (safe to run in a worker process)"""
         results = {
             'asset_name': self.asset_config.asset_name,
             'timestamp': point.timestamp.isoformat(),
@@ -728,3 +736,28 @@ class AnalyticsProcessor:
             status['baseline_calculated'] = self.predictive_analytics.baseline_calculated
         
         return status
+
+
+# Per-process analytics state for worker pools; each worker owns a fixed set of
+# assets so the rolling windows stay consistent across calls
+_worker_processors: Dict[str, AnalyticsProcessor] = {}
+
+
+def init_analytics_worker(asset_configs: List[AssetConfiguration]):
+    """Process pool initializer: build processors for the assets pinned to this worker"""
+    for asset_config in asset_configs:
+        _worker_processors[asset_config.asset_name] = AnalyticsProcessor(asset_config)
+
+
+def run_analytics_batch(asset_name: str, points: List[TelemetryPoint]) -> List[Dict[str, Any]]:
+    """Process pool entry point: run analytics for a batch of points of one asset"""
+    processor = _worker_processors.get(asset_name)
+    if processor is None:
+        return []
+    return processor.analyze_batch(points)
+
+
+def get_analytics_status(asset_name: str) -> Optional[Dict[str, Any]]:
+    """Process pool entry point: status of the processor for one asset"""
+    processor = _worker_processors.get(asset_name)
+    return processor.get_status() if processor is not None else None
@@ -7,15 +7,10 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any, Union
 import json
 from influxdb_client import InfluxDBClient, Point
-from influxdb_client.client.write_api import SYNCHRONOUS, ASYNCHRONOUS
+from influxdb_client.client.write_api import SYNCHRONOUS
 from influxdb_client.client.exceptions import InfluxDBError
 
-# Add parent directory to path for common models
-import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent.parent / "common"))
-
-from data_models import TelemetryPoint, Quality
+from common.data_models import TelemetryPoint, Quality
 
 logger = logging.getLogger(__name__)
 
@@ -36,11 +31,13 @@ class InfluxDBCloudSender:
         self.org = org or os.getenv("INFLUXDB_ORG", "globalcorp")
         self.bucket = bucket or os.getenv("INFLUXDB_BUCKET", "industrial-data")
         self.measurement_prefix = measurement_prefix
+        self.telemetry_measurement = f"{measurement_prefix}_telemetry"
         
         # Client and write API
         self.client: Optional[InfluxDBClient] = None
         self.write_api = None
         self.is_connected = False
+        self.last_error: Optional[Exception] = None
         
         # Statistics
         self.stats = {
@@ -60,19 +57,27 @@ class InfluxDBCloudSender:
             if not self.token:
                 raise ValueError("InfluxDB token not provided. Set INFLUXDB_TOKEN environment variable.")
             
-            # Create client with TLS configuration
+            # Reconnects replace the client; release the old connection pool
+            if self.client:
+                self.client.close()
+            
+            # Create client with TLS configuration; gzip cuts line-protocol payloads ~10x
             self.client = InfluxDBClient(
                 url=self.url,
                 token=self.token,
                 org=self.org,
                 timeout=30000,  # 30 seconds timeout
-                verify_ssl=True  # Ensure TLS verification
+                verify_ssl=True,  # Ensure TLS verification
+                enable_gzip=True
             )
             
             # Test connection
             health = self.client.health()
             if health.status == "pass":
-                self.write_api = self.client.write_api(write_options=ASYNCHRONOUS)
+                # One write API for the life of the client, reusing its HTTP session.
+                # Writes are synchronous so a batch only counts as sent once InfluxDB
+                # acknowledged it; the edge buffer already does the batching and retries
+                self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
                 self.is_connected = True
                 logger.info(f"Connected to InfluxDB Cloud: {self.url}")
                 return True
@@ -111,7 +116,7 @@ class InfluxDBCloudSender:
             quality = telemetry.get('quality', 'GOOD')
             
             # Create point with ISA-95 hierarchy as tags
-            point = Point(f"{self.measurement_prefix}_telemetry") \
+            point = Point(self.telemetry_measurement) \
                 .time(timestamp) \
                 .tag("enterprise", enterprise) \
                 .tag("site", site) \
@@ -125,11 +130,11 @@ class InfluxDBCloudSender:
             if unit:
                 point = point.tag("unit", unit)
             
-            # Add value as field
-            if isinstance(value, (int, float)):
-                point = point.field("value_float", float(value))
-            elif isinstance(value, bool):
+            # Add value as field; bool first, it is a subclass of int
+            if isinstance(value, bool):
                 point = point.field("value_bool", value)
+            elif isinstance(value, (int, float)):
+                point = point.field("value_float", float(value))
             else:
                 point = point.field("value_string", str(value))
             
@@ -161,19 +166,19 @@ class InfluxDBCloudSender:
                 
                 # Add analytics data as fields
                 for key, value in data.items():
-                    if isinstance(value, (int, float)):
-                        point = point.field(f"{key}", float(value))
-                    elif isinstance(value, bool):
+                    if isinstance(value, bool):
                         point = point.field(f"{key}", value)
+                    elif isinstance(value, (int, float)):
+                        point = point.field(f"{key}", float(value))
                     elif isinstance(value, str):
                         point = point.field(f"{key}", value)
                     elif isinstance(value, dict):
                         # Handle nested objects (e.g., predictive analytics)
                         for nested_key, nested_value in value.items():
-                            if isinstance(nested_value, (int, float)):
-                                point = point.field(f"{key}_{nested_key}", float(nested_value))
-                            elif isinstance(nested_value, bool):
+                            if isinstance(nested_value, bool):
                                 point = point.field(f"{key}_{nested_key}", nested_value)
+                            elif isinstance(nested_value, (int, float)):
+                                point = point.field(f"{key}_{nested_key}", float(nested_value))
                             else:
                                 point = point.field(f"{key}_{nested_key}", str(nested_value))
                 
@@ -242,19 +247,26 @@ class InfluxDBCloudSender:
             return False
     
     async def send_mixed_batch(self, telemetry_batch: List[Dict[str, Any]], 
-                             analytics_batch: List[Dict[str, Any]]) -> bool:
-        """Send mixed batch of telemetry and analytics points"""
+                             analytics_batch: List[Dict[str, Any]],
+                             batch_id: Optional[str] = None) -> bool:
+        """Send mixed batch of telemetry and analytics points; batch_id is batch-level metadata for logging"""
+        self.last_error = None
+        batch_label = f" {batch_id}" if batch_id else ""
         if not self.is_connected or (not telemetry_batch and not analytics_batch):
             return False
         
         try:
-            # Convert all data to points
+            # Convert all data to points; telemetry encoded at ingest is passed through as bytes
             points = []
+            encoded_lines = []
             
             # Add telemetry points
             for telemetry in telemetry_batch:
-                point = self.telemetry_to_point(telemetry)
-                points.append(point)
+                encoded = telemetry.get('line_protocol')
+                if encoded:
+                    encoded_lines.append(encoded)
+                else:
+                    points.append(self.telemetry_to_point(telemetry))
             
             # Add analytics points
             for analytics in analytics_batch:
@@ -262,32 +274,54 @@ class InfluxDBCloudSender:
                 points.extend(analytics_points)
             
             # Send all points
-            await self._send_points_async(points)
+            records: List[Union[bytes, Point]] = points
+            if encoded_lines:
+                records = [b'\n'.join(encoded_lines), *points]
+            await self._send_points_async(records)
             
+            total_points = len(encoded_lines) + len(points)
             self.stats['batches_sent'] += 1
-            self.stats['points_sent'] += len(points)
+            self.stats['points_sent'] += total_points
             self.stats['last_send_time'] = datetime.utcnow()
             
-            logger.info(f"Sent mixed batch: {len(telemetry_batch)} telemetry, {len(analytics_batch)} analytics, {len(points)} total points")
+            logger.info(f"Sent mixed batch{batch_label}: {len(telemetry_batch)} telemetry, {len(analytics_batch)} analytics, {total_points} total points")
             return True
             
         except Exception as e:
-            logger.error(f"Failed to send mixed batch: {e}")
+            logger.error(f"Failed to send mixed batch{batch_label}: {e}")
+            self.last_error = e
             self.stats['batches_failed'] += 1
             total_points = len(telemetry_batch) + len(analytics_batch)
             self.stats['points_failed'] += total_points
             return False
     
-    async def _send_points_async(self, points: List[Point]):
+    async def _send_points_async(self, points: List[Union[bytes, Point]]):
         """Send points to InfluxDB asynchronously"""
         try:
-            # Use asyncio to run the synchronous write operation
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self.write_api.write, self.bucket, points)
+            # Use asyncio to run the synchronous write operation; the whole batch is one request
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.write_api.write, self.bucket, self.org, points)
         except Exception as e:
             logger.error(f"Error sending points to InfluxDB: {e}")
             raise
     
+    @staticmethod
+    def classify_error(error: Optional[Exception]) -> str:
+        """Classify a send failure as 'client' (malformed payload, not retryable), 'too_large' (413),
+        'config' (auth, permission or missing bucket), 'server' (5xx/429) or 'connection'"""
+        response = getattr(error, 'response', None) if isinstance(error, InfluxDBError) else None
+        status = getattr(response, 'status', None)
+        if status is not None:
+            if status == 429 or status >= 500:
+                return 'server'
+            if status in (400, 422):
+                return 'client'
+            if status == 413:
+                return 'too_large'
+            if 400 <= status < 500:
+                return 'config'
+        return 'connection'
+    
     async def test_connection(self) -> bool:
         """Test connection to InfluxDB Cloud"""
         try:
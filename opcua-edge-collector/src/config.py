@@ -6,11 +6,13 @@ from pathlib import Path
 from typing import Dict, Any, Optional
 import logging
 
-# Add parent directory to path for common models
-import sys
-sys.path.append(str(Path(__file__).parent.parent.parent / "common"))
+from common.data_models import BridgeConfiguration
 
-from data_models import BridgeConfiguration
+# libyaml-backed loader when available; the pure-Python parser is much slower on large configs
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +29,8 @@ class ConfigManager:
         try:
             # Load base configuration
             config_file = Path(__file__).parent / self.config_path
-            with open(config_file, 'r') as f:
-                config_data = yaml.safe_load(f)
+            with open(config_file, 'rb') as f:
+                config_data = yaml.load(f, Loader=_YamlLoader)
             
             # Apply environment variable overrides
             config_data = self._apply_env_overrides(config_data)
@@ -137,7 +139,7 @@ class ConfigManager:
                         'asset_name': asset.asset_name,
                         'opcua_endpoint': asset.opcua_endpoint,
                         'node_mapping': asset.node_mapping,
-                        'security_settings': getattr(asset, 'security_settings', {}),
+                        'security_settings': asset.security_settings,
                         'metadata': asset.metadata
                     }
         return None
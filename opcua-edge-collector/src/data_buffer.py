@@ -4,17 +4,12 @@ import asyncio
 import logging
 import sqlite3
 import json
-from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Tuple, Union
 import aiosqlite
 from contextlib import asynccontextmanager
 
-# Add parent directory to path for common models
-import sys
-sys.path.append(str(Path(__file__).parent.parent.parent / "common"))
-
-from data_models import TelemetryPoint
+from common.data_models import TelemetryPoint
 
 logger = logging.getLogger(__name__)
 
@@ -25,18 +20,52 @@ class DataBuffer:
     def __init__(self, db_path: str = "data_buffer.db", max_size_mb: int = 100):
         self.db_path = db_path
         self.max_size_bytes = max_size_mb * 1024 * 1024
-        self.connection_pool = None
+        self._db: Optional[aiosqlite.Connection] = None
+        self._db_ro: Optional[aiosqlite.Connection] = None
         self._lock = asyncio.Lock()
         
     async def initialize(self):
-        """Initialize database schema and connection pool"""
+        """Initialize database schema and open the writer and reader connections"""
+        self._db = await aiosqlite.connect(self.db_path)
+        
+        # WAL halves fsync traffic for the append-heavy ingest path; NORMAL sync
+        # is durable across application crashes in WAL mode
+        await self._db.execute("PRAGMA journal_mode = WAL")
+        await self._db.execute("PRAGMA synchronous = NORMAL")
+        await self._db.execute("PRAGMA temp_store = MEMORY")
+        await self._db.execute("PRAGMA wal_autocheckpoint = 10000")
+        await self._tune_connection(self._db)
         await self._create_schema()
+        
+        # Dedicated read-only connection so batch pulls and status polls run on
+        # their own worker thread instead of queueing behind ingest commits
+        ro_uri = f"{Path(self.db_path).absolute().as_uri()}?mode=ro"
+        self._db_ro = await aiosqlite.connect(ro_uri, uri=True)
+        await self._db_ro.execute("PRAGMA query_only = 1")
+        await self._tune_connection(self._db_ro)
+        
         logger.info(f"Data buffer initialized: {self.db_path}")
     
+    async def _tune_connection(self, db: aiosqlite.Connection):
+        """Per-connection cache settings: 256 MB mmap window and 64 MB page cache"""
+        await db.execute("PRAGMA mmap_size = 268435456")
+        await db.execute("PRAGMA cache_size = -65536")
+    
+    def _database_size(self) -> int:
+        """On-disk size of the buffer, including the not yet checkpointed WAL"""
+        size = Path(self.db_path).stat().st_size
+        wal_path = Path(f"{self.db_path}-wal")
+        if wal_path.exists():
+            size += wal_path.stat().st_size
+        return size
+    
     async def _create_schema(self):
         """Create database tables for telemetry and analytics data"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # Telemetry data table
+        db = self._db
+        async with self._lock:
+            # Telemetry data table; analytics results share it as kind = 'analytics'
+            # rows with the asset in machine, the analytics types in tag and the
+            # JSON document in payload, so one query pulls a whole cloud batch
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS telemetry (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -52,23 +81,15 @@ class DataBuffer:
                     quality TEXT NOT NULL,
                     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
                     processed BOOLEAN DEFAULT FALSE,
-                    batch_id TEXT
+                    batch_id TEXT,
+                    kind TEXT NOT NULL DEFAULT 'telemetry',
+                    payload BLOB,
+                    line_protocol BLOB
                 )
             """)
             
-            # Analytics results table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS analytics (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    asset_name TEXT NOT NULL,
-                    analytics_type TEXT NOT NULL,
-                    analytics_data TEXT NOT NULL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    processed BOOLEAN DEFAULT FALSE,
-                    batch_id TEXT
-                )
-            """)
+            # Buffers created before analytics moved into the telemetry table
+            await self._migrate_analytics_table()
             
             # Buffer metadata table
             await db.execute("""
@@ -83,9 +104,6 @@ class DataBuffer:
             await db.execute("CREATE INDEX IF NOT EXISTS idx_telemetry_timestamp ON telemetry(timestamp)")
             await db.execute("CREATE INDEX IF NOT EXISTS idx_telemetry_processed ON telemetry(processed)")
             await db.execute("CREATE INDEX IF NOT EXISTS idx_telemetry_batch ON telemetry(batch_id)")
-            await db.execute("CREATE INDEX IF NOT EXISTS idx_analytics_timestamp ON analytics(timestamp)")
-            await db.execute("CREATE INDEX IF NOT EXISTS idx_analytics_processed ON analytics(processed)")
-            await db.execute("CREATE INDEX IF NOT EXISTS idx_analytics_batch ON analytics(batch_id)")
             
             # Initialize metadata
             await db.execute("""
@@ -95,10 +113,77 @@ class DataBuffer:
             
             await db.commit()
     
+    async def _migrate_analytics_table(self):
+        """Fold a legacy analytics table into the telemetry table (caller holds the lock)"""
+        db = self._db
+        cursor = await db.execute("PRAGMA table_info(telemetry)")
+        columns = {row[1] for row in await cursor.fetchall()}
+        if 'kind' not in columns:
+            await db.execute("ALTER TABLE telemetry ADD COLUMN kind TEXT NOT NULL DEFAULT 'telemetry'")
+            await db.execute("ALTER TABLE telemetry ADD COLUMN payload BLOB")
+        if 'line_protocol' not in columns:
+            await db.execute("ALTER TABLE telemetry ADD COLUMN line_protocol BLOB")
+        
+        cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analytics'")
+        if await cursor.fetchone():
+            await db.execute("""
+                INSERT INTO telemetry 
+                (timestamp, enterprise, site, area, line, machine, tag, value, quality, 
+                 created_at, processed, batch_id, kind, payload)
+                SELECT timestamp, '', '', '', '', asset_name, analytics_type, '', '', 
+                       created_at, processed, batch_id, 'analytics', CAST(analytics_data AS BLOB)
+                FROM analytics
+            """)
+            await db.execute("DROP TABLE analytics")
+            logger.info("Migrated buffered analytics results into the telemetry table")
+    
+    @staticmethod
+    def _analytics_row(analytics_data: Dict[str, Any], batch_id: Optional[str] = None) -> tuple:
+        """Parameters for the analytics INSERT; a missing timestamp stays None so SQLite stamps the row"""
+        analytics = analytics_data.get('analytics', {})
+        return (
+            analytics_data.get('timestamp'),
+            analytics_data.get('asset_name', 'unknown'),
+            ','.join(analytics.keys()),
+            batch_id,
+            json.dumps(analytics).encode()
+        )
+    
+    @staticmethod
+    def _row_to_dict(columns: List[str], row: tuple) -> Dict[str, Any]:
+        """Convert a buffer row to the telemetry or analytics dict handed to the cloud sender"""
+        record = dict(zip(columns, row))
+        payload = record.pop('payload')
+        
+        if record['kind'] == 'analytics':
+            try:
+                analytics_data = json.loads(payload)
+            except (ValueError, TypeError):
+                analytics_data = payload
+            return {
+                'id': record['id'],
+                'timestamp': record['timestamp'],
+                'asset_name': record['machine'],
+                'analytics_type': record['tag'],
+                'analytics_data': analytics_data,
+                'created_at': record['created_at'],
+                'processed': record['processed'],
+                'batch_id': record['batch_id'],
+                'kind': record['kind']
+            }
+        
+        # Parse JSON value if needed
+        try:
+            record['value'] = json.loads(record['value'])
+        except (json.JSONDecodeError, TypeError):
+            pass  # Keep as string if not valid JSON
+        return record
+    
     async def save_telemetry_point(self, point: TelemetryPoint, batch_id: Optional[str] = None) -> bool:
         """Save a single telemetry point to the buffer"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            db = self._db
+            async with self._lock:
                 await db.execute("""
                     INSERT INTO telemetry 
                     (timestamp, enterprise, site, area, line, machine, tag, value, unit, quality, batch_id)
@@ -124,11 +209,11 @@ class DataBuffer:
                 """)
                 
                 await db.commit()
-                
-                # Check buffer size
-                await self._check_buffer_size(db)
-                
-                return True
+            
+            # Check buffer size outside the lock; cleanup takes it again
+            await self._check_buffer_size()
+            
+            return True
                 
         except Exception as e:
             logger.error(f"Error saving telemetry point: {e}")
@@ -137,22 +222,13 @@ class DataBuffer:
     async def save_analytics_result(self, analytics_data: Dict[str, Any], batch_id: Optional[str] = None) -> bool:
         """Save analytics results to the buffer"""
         try:
-            asset_name = analytics_data.get('asset_name', 'unknown')
-            timestamp = analytics_data.get('timestamp', datetime.utcnow().isoformat())
-            analytics_json = json.dumps(analytics_data.get('analytics', {}))
-            
-            async with aiosqlite.connect(self.db_path) as db:
+            db = self._db
+            async with self._lock:
                 await db.execute("""
-                    INSERT INTO analytics 
-                    (timestamp, asset_name, analytics_type, analytics_data, batch_id)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    timestamp,
-                    asset_name,
-                    ','.join(analytics_data.get('analytics', {}).keys()),
-                    analytics_json,
-                    batch_id
-                ))
+                    INSERT INTO telemetry 
+                    (timestamp, enterprise, site, area, line, machine, tag, value, quality, batch_id, kind, payload)
+                    VALUES (COALESCE(?, strftime('%Y-%m-%dT%H:%M:%f', 'now')), '', '', '', '', ?, ?, '', '', ?, 'analytics', ?)
+                """, self._analytics_row(analytics_data, batch_id))
                 
                 await db.execute("""
                     UPDATE buffer_metadata 
@@ -161,11 +237,11 @@ class DataBuffer:
                 """)
                 
                 await db.commit()
-                
-                # Check buffer size
-                await self._check_buffer_size(db)
-                
-                return True
+            
+            # Check buffer size outside the lock; cleanup takes it again
+            await self._check_buffer_size()
+            
+            return True
                 
         except Exception as e:
             logger.error(f"Error saving analytics result: {e}")
@@ -176,7 +252,8 @@ class DataBuffer:
                         batch_id: str) -> bool:
         """Save a batch of telemetry points and analytics results"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            db = self._db
+            async with self._lock:
                 # Save telemetry points
                 for point in telemetry_points:
                     await db.execute("""
@@ -199,21 +276,11 @@ class DataBuffer:
                 
                 # Save analytics results
                 for analytics_data in analytics_results:
-                    asset_name = analytics_data.get('asset_name', 'unknown')
-                    timestamp = analytics_data.get('timestamp', datetime.utcnow().isoformat())
-                    analytics_json = json.dumps(analytics_data.get('analytics', {}))
-                    
                     await db.execute("""
-                        INSERT INTO analytics 
-                        (timestamp, asset_name, analytics_type, analytics_data, batch_id)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (
-                        timestamp,
-                        asset_name,
-                        ','.join(analytics_data.get('analytics', {}).keys()),
-                        analytics_json,
-                        batch_id
-                    ))
+                        INSERT INTO telemetry 
+                        (timestamp, enterprise, site, area, line, machine, tag, value, quality, batch_id, kind, payload)
+                        VALUES (COALESCE(?, strftime('%Y-%m-%dT%H:%M:%f', 'now')), '', '', '', '', ?, ?, '', '', ?, 'analytics', ?)
+                    """, self._analytics_row(analytics_data, batch_id))
                 
                 # Update metadata
                 await db.execute("""
@@ -229,157 +296,187 @@ class DataBuffer:
                 """, (len(analytics_results),))
                 
                 await db.commit()
-                
-                # Check buffer size
-                await self._check_buffer_size(db)
-                
-                logger.info(f"Saved batch {batch_id}: {len(telemetry_points)} telemetry points, {len(analytics_results)} analytics results")
-                return True
+            
+            # Check buffer size outside the lock; cleanup takes it again
+            await self._check_buffer_size()
+            
+            logger.info(f"Saved batch {batch_id}: {len(telemetry_points)} telemetry points, {len(analytics_results)} analytics results")
+            return True
                 
         except Exception as e:
             logger.error(f"Error saving batch {batch_id}: {e}")
             return False
     
-    async def get_telemetry_batch(self, batch_size: int = 100, 
-                                include_processed: bool = False) -> List[Dict[str, Any]]:
-        """Get a batch of telemetry points from the buffer"""
+    async def save_telemetry_batch(self, telemetry_points: List[TelemetryPoint],
+                                   analytics_results: Optional[List[Dict[str, Any]]] = None,
+                                   encoded_lines: Optional[List[bytes]] = None) -> bool:
+        """Bulk insert telemetry points and analytics results in a single transaction.
+        
+        encoded_lines, when given, holds each point's pre-encoded InfluxDB line
+        protocol so the cloud send path does not serialize it again.
+        """
+        analytics_results = analytics_results or []
+        if encoded_lines is None:
+            encoded_lines = [None] * len(telemetry_points)
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                if include_processed:
-                    query = """
-                        SELECT * FROM telemetry 
-                        ORDER BY created_at ASC 
-                        LIMIT ?
-                    """
-                else:
-                    query = """
-                        SELECT * FROM telemetry 
-                        WHERE processed = FALSE 
-                        ORDER BY created_at ASC 
-                        LIMIT ?
-                    """
-                
-                cursor = await db.execute(query, (batch_size,))
-                rows = await cursor.fetchall()
-                
-                # Convert rows to dictionaries
-                columns = [description[0] for description in cursor.description]
-                telemetry_batch = []
-                
-                for row in rows:
-                    telemetry_dict = dict(zip(columns, row))
-                    # Parse JSON value if needed
-                    try:
-                        telemetry_dict['value'] = json.loads(telemetry_dict['value'])
-                    except (json.JSONDecodeError, TypeError):
-                        pass  # Keep as string if not valid JSON
-                    telemetry_batch.append(telemetry_dict)
-                
-                return telemetry_batch
+            telemetry_rows = [
+                (
+                    point.timestamp.isoformat(),
+                    point.enterprise,
+                    point.site,
+                    point.area,
+                    point.line,
+                    point.machine,
+                    point.tag,
+                    json.dumps(point.value) if not isinstance(point.value, str) else point.value,
+                    point.unit,
+                    point.quality.value,
+                    encoded_line,
+                )
+                for point, encoded_line in zip(telemetry_points, encoded_lines)
+            ]
+            analytics_rows = [self._analytics_row(analytics_data) for analytics_data in analytics_results]
+            
+            db = self._db
+            async with self._lock:
+                await db.execute("BEGIN IMMEDIATE")
+                try:
+                    await db.executemany("""
+                        INSERT INTO telemetry 
+                        (timestamp, enterprise, site, area, line, machine, tag, value, unit, quality, line_protocol)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, telemetry_rows)
+                    
+                    if analytics_rows:
+                        await db.executemany("""
+                            INSERT INTO telemetry 
+                            (timestamp, enterprise, site, area, line, machine, tag, value, quality, batch_id, kind, payload)
+                            VALUES (COALESCE(?, strftime('%Y-%m-%dT%H:%M:%f', 'now')), '', '', '', '', ?, ?, '', '', ?, 'analytics', ?)
+                        """, analytics_rows)
+                    
+                    await db.execute("""
+                        UPDATE buffer_metadata 
+                        SET value = value + CASE key 
+                            WHEN 'total_telemetry_points' THEN ? 
+                            ELSE ? END, 
+                            updated_at = CURRENT_TIMESTAMP 
+                        WHERE key IN ('total_telemetry_points', 'total_analytics_records')
+                    """, (len(telemetry_rows), len(analytics_rows)))
+                    
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+            
+            # Check buffer size outside the lock; cleanup takes it again
+            await self._check_buffer_size()
+            
+            return True
                 
         except Exception as e:
-            logger.error(f"Error getting telemetry batch: {e}")
-            return []
+            logger.error(f"Error saving telemetry batch: {e}")
+            return False
+    
+    async def get_batch(self, batch_size: int = 100, 
+                        include_processed: bool = False,
+                        after_id: int = 0) -> List[Dict[str, Any]]:
+        """Get a batch of telemetry and analytics rows in insert order, starting after row id after_id"""
+        return await self._get_rows(None, batch_size, include_processed, after_id)
+    
+    async def get_telemetry_batch(self, batch_size: int = 100, 
+                                include_processed: bool = False,
+                                after_id: int = 0) -> List[Dict[str, Any]]:
+        """Get a batch of telemetry points from the buffer, starting after row id after_id"""
+        return await self._get_rows('telemetry', batch_size, include_processed, after_id)
     
     async def get_analytics_batch(self, batch_size: int = 100, 
-                                 include_processed: bool = False) -> List[Dict[str, Any]]:
-        """Get a batch of analytics results from the buffer"""
+                                 include_processed: bool = False,
+                                 after_id: int = 0) -> List[Dict[str, Any]]:
+        """Get a batch of analytics results from the buffer, starting after row id after_id"""
+        return await self._get_rows('analytics', batch_size, include_processed, after_id)
+    
+    async def _get_rows(self, kind: Optional[str], batch_size: int,
+                        include_processed: bool, after_id: int) -> List[Dict[str, Any]]:
+        """Keyset-paginated read of buffer rows, optionally limited to one kind"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                if include_processed:
-                    query = """
-                        SELECT * FROM analytics 
-                        ORDER BY created_at ASC 
-                        LIMIT ?
-                    """
-                else:
-                    query = """
-                        SELECT * FROM analytics 
-                        WHERE processed = FALSE 
-                        ORDER BY created_at ASC 
-                        LIMIT ?
-                    """
-                
-                cursor = await db.execute(query, (batch_size,))
-                rows = await cursor.fetchall()
-                
-                # Convert rows to dictionaries
-                columns = [description[0] for description in cursor.description]
-                analytics_batch = []
-                
-                for row in rows:
-                    analytics_dict = dict(zip(columns, row))
-                    # Parse JSON analytics data
-                    try:
-                        analytics_dict['analytics_data'] = json.loads(analytics_dict['analytics_data'])
-                    except (json.JSONDecodeError, TypeError):
-                        pass  # Keep as string if not valid JSON
-                    analytics_batch.append(analytics_dict)
-                
-                return analytics_batch
-                
+            db = self._db_ro
+            conditions = ["id > ?"]
+            params: List[Any] = [after_id]
+            if not include_processed:
+                conditions.append("processed = FALSE")
+            if kind is not None:
+                conditions.append("kind = ?")
+                params.append(kind)
+            params.append(batch_size)
+            
+            cursor = await db.execute(f"""
+                SELECT * FROM telemetry 
+                WHERE {' AND '.join(conditions)} 
+                ORDER BY id ASC 
+                LIMIT ?
+            """, params)
+            rows = await cursor.fetchall()
+            
+            columns = [description[0] for description in cursor.description]
+            return [self._row_to_dict(columns, row) for row in rows]
+            
         except Exception as e:
-            logger.error(f"Error getting analytics batch: {e}")
+            logger.error(f"Error getting {kind or 'buffer'} batch: {e}")
             return []
     
     async def get_batch_by_id(self, batch_id: str) -> Dict[str, List[Dict[str, Any]]]:
         """Get telemetry and analytics data by batch ID"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                # Get telemetry data
-                cursor = await db.execute("""
-                    SELECT * FROM telemetry WHERE batch_id = ? ORDER BY created_at ASC
-                """, (batch_id,))
-                telemetry_rows = await cursor.fetchall()
-                telemetry_columns = [description[0] for description in cursor.description]
-                
-                telemetry_data = []
-                for row in telemetry_rows:
-                    telemetry_dict = dict(zip(telemetry_columns, row))
-                    try:
-                        telemetry_dict['value'] = json.loads(telemetry_dict['value'])
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-                    telemetry_data.append(telemetry_dict)
-                
-                # Get analytics data
-                cursor = await db.execute("""
-                    SELECT * FROM analytics WHERE batch_id = ? ORDER BY created_at ASC
-                """, (batch_id,))
-                analytics_rows = await cursor.fetchall()
-                analytics_columns = [description[0] for description in cursor.description]
-                
-                analytics_data = []
-                for row in analytics_rows:
-                    analytics_dict = dict(zip(analytics_columns, row))
-                    try:
-                        analytics_dict['analytics_data'] = json.loads(analytics_dict['analytics_data'])
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-                    analytics_data.append(analytics_dict)
-                
-                return {
-                    'telemetry': telemetry_data,
-                    'analytics': analytics_data
-                }
-                
+            db = self._db_ro
+            cursor = await db.execute("""
+                SELECT * FROM telemetry WHERE batch_id = ? ORDER BY id ASC
+            """, (batch_id,))
+            rows = await cursor.fetchall()
+            columns = [description[0] for description in cursor.description]
+            
+            batch = {'telemetry': [], 'analytics': []}
+            for row in rows:
+                record = self._row_to_dict(columns, row)
+                batch[record['kind']].append(record)
+            
+            return batch
+            
         except Exception as e:
             logger.error(f"Error getting batch {batch_id}: {e}")
             return {'telemetry': [], 'analytics': []}
     
-    async def mark_batch_processed(self, batch_id: str) -> bool:
-        """Mark a batch as processed"""
+    async def claim_batch(self, batch_id: str, row_ids: List[int]) -> bool:
+        """Tag the given rows with batch_id in the database so the batch can be finalized later"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            db = self._db
+            async with self._lock:
+                # Ids travel as one JSON array so large batches stay under the bound-variable limit
                 await db.execute("""
-                    UPDATE telemetry SET processed = TRUE WHERE batch_id = ?
-                """, (batch_id,))
+                    UPDATE telemetry SET batch_id = ? 
+                    WHERE id IN (SELECT value FROM json_each(?))
+                """, (batch_id, json.dumps(row_ids)))
                 
+                await db.commit()
+            
+            return True
+                
+        except Exception as e:
+            logger.error(f"Error claiming batch {batch_id}: {e}")
+            return False
+    
+    async def mark_batch_processed(self, batch_id: str) -> bool:
+        """Mark a batch as processed"""
+        try:
+            db = self._db
+            async with self._lock:
+                # Rows that are already processed are filtered out so no pages get dirtied
                 await db.execute("""
-                    UPDATE analytics SET processed = TRUE WHERE batch_id = ?
+                    UPDATE telemetry SET processed = TRUE 
+                    WHERE batch_id = ? AND processed = FALSE
                 """, (batch_id,))
                 
                 await db.commit()
+                
                 logger.info(f"Marked batch {batch_id} as processed")
                 return True
                 
@@ -387,35 +484,34 @@ class DataBuffer:
             logger.error(f"Error marking batch {batch_id} as processed: {e}")
             return False
     
+    async def _delete_rows(self, where: str, params: tuple) -> Tuple[int, int]:
+        """Delete matching rows and update the counters; caller holds the lock in a transaction"""
+        db = self._db
+        cursor = await db.execute(f"""
+            SELECT COALESCE(SUM(kind = 'telemetry'), 0), COALESCE(SUM(kind = 'analytics'), 0) 
+            FROM telemetry WHERE {where}
+        """, params)
+        telemetry_count, analytics_count = await cursor.fetchone()
+        
+        await db.execute(f"DELETE FROM telemetry WHERE {where}", params)
+        
+        await db.execute("""
+            UPDATE buffer_metadata 
+            SET value = value - CASE key 
+                WHEN 'total_telemetry_points' THEN ? 
+                ELSE ? END, 
+                updated_at = CURRENT_TIMESTAMP 
+            WHERE key IN ('total_telemetry_points', 'total_analytics_records')
+        """, (telemetry_count, analytics_count))
+        
+        return telemetry_count, analytics_count
+    
     async def delete_batch(self, batch_id: str) -> bool:
         """Delete a batch from the buffer"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                # Get counts before deletion
-                cursor = await db.execute("SELECT COUNT(*) FROM telemetry WHERE batch_id = ?", (batch_id,))
-                telemetry_count = (await cursor.fetchone())[0]
-                
-                cursor = await db.execute("SELECT COUNT(*) FROM analytics WHERE batch_id = ?", (batch_id,))
-                analytics_count = (await cursor.fetchone())[0]
-                
-                # Delete telemetry data
-                await db.execute("DELETE FROM telemetry WHERE batch_id = ?", (batch_id,))
-                
-                # Delete analytics data
-                await db.execute("DELETE FROM analytics WHERE batch_id = ?", (batch_id,))
-                
-                # Update metadata
-                await db.execute("""
-                    UPDATE buffer_metadata 
-                    SET value = value - ?, updated_at = CURRENT_TIMESTAMP 
-                    WHERE key = 'total_telemetry_points'
-                """, (telemetry_count,))
-                
-                await db.execute("""
-                    UPDATE buffer_metadata 
-                    SET value = value - ?, updated_at = CURRENT_TIMESTAMP 
-                    WHERE key = 'total_analytics_records'
-                """, (analytics_count,))
+            db = self._db
+            async with self._lock:
+                telemetry_count, analytics_count = await self._delete_rows("batch_id = ?", (batch_id,))
                 
                 await db.commit()
                 logger.info(f"Deleted batch {batch_id}: {telemetry_count} telemetry points, {analytics_count} analytics records")
@@ -425,37 +521,65 @@ class DataBuffer:
             logger.error(f"Error deleting batch {batch_id}: {e}")
             return False
     
-    async def delete_processed_batches(self, older_than_hours: int = 24) -> int:
-        """Delete processed batches older than specified hours"""
+    async def finalize_batch(self, batch_id: str) -> bool:
+        """Drop a successfully sent batch from the buffer in a single transaction"""
         try:
-            cutoff_time = (datetime.utcnow() - timedelta(hours=older_than_hours)).isoformat()
+            db = self._db
+            async with self._lock:
+                # Marking the rows processed first would be rewritten by the
+                # delete anyway, so the delete is the whole commit
+                await db.execute("BEGIN IMMEDIATE")
+                try:
+                    telemetry_count, analytics_count = await self._delete_rows("batch_id = ?", (batch_id,))
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
             
-            async with aiosqlite.connect(self.db_path) as db:
-                # Get batch IDs to delete
-                cursor = await db.execute("""
-                    SELECT DISTINCT batch_id FROM telemetry 
-                    WHERE processed = TRUE AND created_at < ? AND batch_id IS NOT NULL
-                """, (cutoff_time,))
+            logger.info(f"Finalized batch {batch_id}: {telemetry_count} telemetry points, {analytics_count} analytics records")
+            return True
                 
-                batch_ids = [row[0] for row in await cursor.fetchall()]
-                
-                deleted_count = 0
-                for batch_id in batch_ids:
-                    if await self.delete_batch(batch_id):
-                        deleted_count += 1
-                
-                logger.info(f"Deleted {deleted_count} processed batches older than {older_than_hours} hours")
-                return deleted_count
+        except Exception as e:
+            logger.error(f"Error finalizing batch {batch_id}: {e}")
+            return False
+    
+    async def delete_processed_batches(self, older_than_hours: int = 24) -> int:
+        """Delete processed batches older than specified hours, returning the number of rows removed"""
+        try:
+            # Cutoff is computed by SQLite so it compares in the same format as
+            # created_at (CURRENT_TIMESTAMP, 'YYYY-MM-DD HH:MM:SS')
+            batch_filter = """
+                SELECT DISTINCT batch_id FROM telemetry 
+                WHERE processed = TRUE AND created_at < datetime('now', ?) AND batch_id IS NOT NULL
+            """
+            cutoff = (f"-{older_than_hours} hours",)
+            
+            db = self._db
+            async with self._lock:
+                await db.execute("BEGIN IMMEDIATE")
+                try:
+                    telemetry_count, analytics_count = await self._delete_rows(
+                        f"batch_id IN ({batch_filter})", cutoff
+                    )
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+            
+            deleted_count = telemetry_count + analytics_count
+            logger.info(f"Deleted {telemetry_count} telemetry points and {analytics_count} analytics records "
+                        f"from processed batches older than {older_than_hours} hours")
+            return deleted_count
                 
         except Exception as e:
             logger.error(f"Error deleting processed batches: {e}")
             return 0
     
-    async def _check_buffer_size(self, db: aiosqlite.Connection):
+    async def _check_buffer_size(self):
         """Check buffer size and clean up if necessary"""
         try:
             # Get current database size
-            db_size = Path(self.db_path).stat().st_size
+            db_size = self._database_size()
             
             if db_size > self.max_size_bytes:
                 logger.warning(f"Buffer size ({db_size} bytes) exceeds limit ({self.max_size_bytes} bytes)")
@@ -464,19 +588,20 @@ class DataBuffer:
                 await self.delete_processed_batches(older_than_hours=1)
                 
                 # If still too large, delete oldest unprocessed telemetry
-                new_size = Path(self.db_path).stat().st_size
+                new_size = self._database_size()
                 if new_size > self.max_size_bytes:
-                    await db.execute("""
-                        DELETE FROM telemetry 
-                        WHERE processed = FALSE 
-                        AND id IN (
-                            SELECT id FROM telemetry 
+                    async with self._lock:
+                        await self._db.execute("""
+                            DELETE FROM telemetry 
                             WHERE processed = FALSE 
-                            ORDER BY created_at ASC 
-                            LIMIT 1000
-                        )
-                    """)
-                    await db.commit()
+                            AND id IN (
+                                SELECT id FROM telemetry 
+                                WHERE processed = FALSE 
+                                ORDER BY created_at ASC 
+                                LIMIT 1000
+                            )
+                        """)
+                        await self._db.commit()
                     logger.warning("Deleted oldest unprocessed telemetry to free space")
                 
         except Exception as e:
@@ -485,48 +610,50 @@ class DataBuffer:
     async def get_buffer_status(self) -> Dict[str, Any]:
         """Get current buffer status and statistics"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                # Get telemetry statistics
-                cursor = await db.execute("""
-                    SELECT 
-                        COUNT(*) as total,
-                        SUM(CASE WHEN processed = FALSE THEN 1 ELSE 0 END) as unprocessed,
-                        MIN(created_at) as oldest,
-                        MAX(created_at) as newest
-                    FROM telemetry
-                """)
-                telemetry_stats = dict(zip([desc[0] for desc in cursor.description], await cursor.fetchone()))
-                
-                # Get analytics statistics
-                cursor = await db.execute("""
-                    SELECT 
-                        COUNT(*) as total,
-                        SUM(CASE WHEN processed = FALSE THEN 1 ELSE 0 END) as unprocessed,
-                        MIN(created_at) as oldest,
-                        MAX(created_at) as newest
-                    FROM analytics
-                """)
-                analytics_stats = dict(zip([desc[0] for desc in cursor.description], await cursor.fetchone()))
-                
-                # Get database size
-                db_size = Path(self.db_path).stat().st_size
-                
-                return {
-                    'database_path': self.db_path,
-                    'database_size_bytes': db_size,
-                    'database_size_mb': round(db_size / (1024 * 1024), 2),
-                    'max_size_mb': round(self.max_size_bytes / (1024 * 1024), 2),
-                    'telemetry': telemetry_stats,
-                    'analytics': analytics_stats
-                }
-                
+            db = self._db_ro
+            # Per-kind statistics in one pass over the shared table
+            cursor = await db.execute("""
+                SELECT 
+                    kind,
+                    COUNT(*) as total,
+                    SUM(CASE WHEN processed = FALSE THEN 1 ELSE 0 END) as unprocessed,
+                    MIN(created_at) as oldest,
+                    MAX(created_at) as newest
+                FROM telemetry
+                GROUP BY kind
+            """)
+            columns = [desc[0] for desc in cursor.description][1:]
+            stats = {
+                kind: {'total': 0, 'unprocessed': None, 'oldest': None, 'newest': None}
+                for kind in ('telemetry', 'analytics')
+            }
+            for row in await cursor.fetchall():
+                stats[row[0]] = dict(zip(columns, row[1:]))
+            
+            # Get database size
+            db_size = self._database_size()
+            
+            return {
+                'database_path': self.db_path,
+                'database_size_bytes': db_size,
+                'database_size_mb': round(db_size / (1024 * 1024), 2),
+                'max_size_mb': round(self.max_size_bytes / (1024 * 1024), 2),
+                'telemetry': stats['telemetry'],
+                'analytics': stats['analytics']
+            }
+            
         except Exception as e:
             logger.error(f"Error getting buffer status: {e}")
             return {}
     
     async def close(self):
         """Close database connections"""
-        # aiosqlite manages connections automatically, but we can add cleanup here if needed
+        if self._db_ro is not None:
+            await self._db_ro.close()
+            self._db_ro = None
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
         logger.info("Data buffer closed")
 
 
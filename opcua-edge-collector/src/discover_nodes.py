@@ -9,13 +9,12 @@ import asyncio
 import logging
 import argparse
 import sys
-from pathlib import Path
-from typing import List, Dict, Any, Optional
-from asyncua import Client, ua
+from typing import List, Dict, Any, Optional, Tuple, Union
+import aiofiles
+import orjson
+from asyncua import Client, Node, ua
 from datetime import datetime
-
-# Add parent directory to path for common models
-sys.path.append(str(Path(__file__).parent.parent.parent / "common"))
+from dataclasses import dataclass
 
 # Configure logging
 logging.basicConfig(
@@ -24,16 +23,74 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Server OperationLimits that size batched requests; DEFAULT_OPERATION_LIMIT is
+# used when a server doesn't advertise one (or advertises 0, i.e. no limit)
+DEFAULT_OPERATION_LIMIT = 1000
+OPERATION_LIMIT_NODES = {
+    'MaxNodesPerRead': ua.ObjectIds.Server_ServerCapabilities_OperationLimits_MaxNodesPerRead,
+    'MaxNodesPerBrowse': ua.ObjectIds.Server_ServerCapabilities_OperationLimits_MaxNodesPerBrowse,
+    'MaxNodesPerRegisterNodes': ua.ObjectIds.Server_ServerCapabilities_OperationLimits_MaxNodesPerRegisterNodes,
+    'MaxMonitoredItemsPerCall': ua.ObjectIds.Server_ServerCapabilities_OperationLimits_MaxMonitoredItemsPerCall,
+}
+
+# Entry points every discovery run starts from; preloaded right after connect
+WELL_KNOWN_NODES = [
+    ua.ObjectIds.RootFolder,
+    ua.ObjectIds.ObjectsFolder,
+    ua.ObjectIds.TypesFolder,
+    ua.ObjectIds.Server,
+]
+
+# Precomputed tree indentation, one entry per depth
+INDENTS = ["  " * depth for depth in range(64)]
+
+# Reference fields discovery actually uses; the rest are not sent by the server
+BROWSE_RESULT_MASK = (ua.BrowseResultMask.BrowseName | ua.BrowseResultMask.DisplayName |
+                      ua.BrowseResultMask.NodeClass | ua.BrowseResultMask.TypeDefinition)
+
+
+@dataclass(slots=True)
+class NodeRecord:
+    """One discovered node; parent is an index into OPCUANodeDiscovery.records (-1 for a root)"""
+    node_id: str
+    browse_name: Optional[str]
+    display_name: Optional[str]
+    node_class: Optional[int]
+    data_type: Optional[str]
+    parent: int
+
 
 class OPCUANodeDiscovery:
     """OPC UA Node Discovery utility"""
     
-    def __init__(self, endpoint: str, security_policy: str = "None"):
+    def __init__(self, endpoint: str, security_policy: str = "None", verbose_tree: bool = False):
         self.endpoint = endpoint
         self.security_policy = security_policy
+        self.verbose_tree = verbose_tree  # Log every discovered node, not just summaries
         self.client = None
+        self._connected = False
+        self._preload_task: Optional[asyncio.Task] = None
         self.discovered_nodes = {}
+        self.records: List[NodeRecord] = []  # Flat list of browsed nodes
+        self.children_idx: List[List[int]] = []  # children_idx[i] = indices of records[i]'s children
         self.max_depth = 3  # Maximum depth for recursive discovery
+        self.max_concurrent_requests = 64
+        self._sem = asyncio.Semaphore(self.max_concurrent_requests)  # Cap in-flight requests to the server
+        # Batch sizes for Read/Browse/RegisterNodes/CreateMonitoredItems, replaced
+        # by the server's advertised OperationLimits at connect
+        self.op_limits: Dict[str, int] = dict.fromkeys(OPERATION_LIMIT_NODES, DEFAULT_OPERATION_LIMIT)
+        self.min_nodes_to_register = 50  # Below this the extra round-trip doesn't pay off
+        self._registered_node_ids: List[ua.NodeId] = []
+        self.snapshot_publishing_interval = 100  # ms, for live snapshot subscriptions
+        self.search_workers = 8  # Concurrent browse workers in find_nodes_by_type
+        
+        # Metadata caches shared by browse_node and find_nodes_by_type, which walk the same tree;
+        # keyed by NodeId objects (hashable on namespace + identifier), never by their strings
+        self._attr_cache: Dict[Tuple[ua.NodeId, int], ua.DataValue] = {}
+        self._children_cache: Dict[Tuple[ua.NodeId, int], List[ua.ReferenceDescription]] = {}
+        
+        # Node classes followed when browsing; Methods, types etc. are skipped server-side
+        self.node_class_mask = ua.NodeClass.Object | ua.NodeClass.Variable
         
     async def connect(self) -> bool:
         """Connect to OPC UA server with security negotiation"""
@@ -54,25 +111,245 @@ class OPCUANodeDiscovery:
             
             # Connect
             await self.client.connect()
+            self._connected = True
             logger.info("Successfully connected to OPC UA server")
+            
+            await self._read_operation_limits()
+            
+            # Warm the caches with the well-known top of the address space while
+            # the caller moves on; discovery steps that need it await the task
+            self._preload_task = asyncio.create_task(self._preload_well_known())
             return True
             
         except Exception as e:
             logger.error(f"Failed to connect: {e}")
             return False
     
+    async def _preload_well_known(self):
+        """Read and browse RootFolder, Objects, Types and Server in one batch each"""
+        try:
+            node_ids = [ua.NodeId(object_id) for object_id in WELL_KNOWN_NODES]
+            await asyncio.gather(
+                self._read_node_details(node_ids),
+                self._browse_references(node_ids)
+            )
+        except Exception as e:
+            logger.debug(f"Preloading well-known nodes failed: {e}")
+    
+    async def _await_preload(self):
+        """Wait for the connect-time preload (usually finished already)"""
+        if self._preload_task is not None:
+            await self._preload_task
+            self._preload_task = None
+    
+    async def _read_operation_limits(self):
+        """Size all batched requests from the server's advertised OperationLimits (one Read)"""
+        try:
+            limit_ids = [ua.NodeId(object_id) for object_id in OPERATION_LIMIT_NODES.values()]
+            values = await self._read_attributes(limit_ids, [ua.AttributeIds.Value])
+            for name, data_value in zip(OPERATION_LIMIT_NODES, values):
+                # 0 (or missing) means the server doesn't enforce a limit; keep the default batch size
+                limit = _value_of(data_value)
+                if limit:
+                    self.op_limits[name] = limit
+            logger.debug(f"Operation limits: {self.op_limits}")
+        except Exception as e:
+            logger.debug(f"Server does not expose OperationLimits, using defaults: {e}")
+    
+    async def _read_attributes(self, node_ids: List[ua.NodeId], 
+                               attribute_ids: List[ua.AttributeIds]) -> List[ua.DataValue]:
+        """Read several attributes of several nodes with batched Read service calls
+        
+        Results are returned node-major: all attributes of node_ids[0], then node_ids[1], ...
+        Metadata attributes are served from self._attr_cache when already known;
+        Value is always read from the server.
+        """
+        data_values: List[Optional[ua.DataValue]] = []
+        nodes_to_read = []
+        missing = []  # Positions in data_values that need a server read
+        for node_id in node_ids:
+            for attribute_id in attribute_ids:
+                cached = None
+                if attribute_id != ua.AttributeIds.Value:
+                    cached = self._attr_cache.get((node_id, attribute_id))
+                data_values.append(cached)
+                if cached is None:
+                    read_value_id = ua.ReadValueId()
+                    read_value_id.NodeId = node_id
+                    read_value_id.AttributeId = attribute_id
+                    nodes_to_read.append(read_value_id)
+                    missing.append(len(data_values) - 1)
+        
+        if not nodes_to_read:
+            return data_values
+        
+        async def read_chunk(chunk):
+            params = ua.ReadParameters()
+            params.NodesToRead = chunk
+            async with self._sem:
+                return await self.client.uaclient.read(params)
+        
+        chunk_size = self.op_limits['MaxNodesPerRead']
+        results = await asyncio.gather(*(
+            read_chunk(nodes_to_read[i:i + chunk_size])
+            for i in range(0, len(nodes_to_read), chunk_size)
+        ))
+        
+        fresh_values = (data_value for chunk in results for data_value in chunk)
+        for position, read_value_id, data_value in zip(missing, nodes_to_read, fresh_values):
+            data_values[position] = data_value
+            if read_value_id.AttributeId != ua.AttributeIds.Value:
+                self._attr_cache[(read_value_id.NodeId, read_value_id.AttributeId)] = data_value
+        return data_values
+    
+    async def _browse_references(self, node_ids: List[ua.NodeId],
+                                 node_class_mask: Optional[int] = None) -> List[List[ua.ReferenceDescription]]:
+        """Browse the hierarchical children of many nodes with batched Browse/BrowseNext calls
+        
+        Returns one list of ReferenceDescriptions per input node, in input order.
+        Only hierarchical references to nodes matching node_class_mask (default
+        self.node_class_mask) are returned. Nodes browsed before with the same
+        mask are answered from self._children_cache.
+        """
+        if node_class_mask is None:
+            node_class_mask = self.node_class_mask
+        cached = [self._children_cache.get((node_id, node_class_mask)) for node_id in node_ids]
+        to_browse = [node_id for node_id, refs in zip(node_ids, cached) if refs is None]
+        references: List[List[ua.ReferenceDescription]] = [[] for _ in to_browse]
+        
+        async def browse_chunk(start: int, chunk: List[ua.NodeId]):
+            params = ua.BrowseParameters()
+            params.View = ua.ViewDescription()
+            params.RequestedMaxReferencesPerNode = 0
+            for node_id in chunk:
+                description = ua.BrowseDescription()
+                description.NodeId = node_id
+                description.BrowseDirection = ua.BrowseDirection.Forward
+                description.ReferenceTypeId = ua.NodeId(ua.ObjectIds.HierarchicalReferences)
+                description.IncludeSubtypes = True
+                description.NodeClassMask = node_class_mask
+                description.ResultMask = BROWSE_RESULT_MASK
+                params.NodesToBrowse.append(description)
+            
+            async with self._sem:
+                results = await self.client.uaclient.browse(params)
+            
+            # Follow continuation points for all nodes of the chunk in one BrowseNext per round
+            pending = []
+            for i, result in enumerate(results):
+                references[start + i].extend(result.References)
+                if result.ContinuationPoint:
+                    pending.append((start + i, result.ContinuationPoint))
+            
+            while pending:
+                next_params = ua.BrowseNextParameters()
+                next_params.ReleaseContinuationPoints = False
+                next_params.ContinuationPoints = [point for _, point in pending]
+                async with self._sem:
+                    results = await self.client.uaclient.browse_next(next_params)
+                
+                still_pending = []
+                for (index, _), result in zip(pending, results):
+                    references[index].extend(result.References)
+                    if result.ContinuationPoint:
+                        still_pending.append((index, result.ContinuationPoint))
+                pending = still_pending
+        
+        chunk_size = self.op_limits['MaxNodesPerBrowse']
+        await asyncio.gather(*(
+            browse_chunk(i, to_browse[i:i + chunk_size])
+            for i in range(0, len(to_browse), chunk_size)
+        ))
+        
+        fresh_references = iter(references)
+        result = []
+        for node_id, refs in zip(node_ids, cached):
+            if refs is None:
+                refs = next(fresh_references)
+                self._children_cache[(node_id, node_class_mask)] = refs
+            result.append(refs)
+        return result
+    
+    async def _register_nodes(self, node_ids: List[ua.NodeId]) -> List[ua.NodeId]:
+        """Register nodes for the session so repeated reads use server-side handles
+        
+        Returns the NodeIds to read with: the registered aliases, or the
+        originals if the batch is too small to be worth it or the server
+        doesn't support RegisterNodes.
+        """
+        if len(node_ids) < self.min_nodes_to_register:
+            return node_ids
+        
+        try:
+            chunk_size = self.op_limits['MaxNodesPerRegisterNodes']
+            registered = []
+            for i in range(0, len(node_ids), chunk_size):
+                async with self._sem:
+                    registered.extend(await self.client.uaclient.register_nodes(node_ids[i:i + chunk_size]))
+            self._registered_node_ids.extend(registered)
+            return registered
+        except Exception as e:
+            logger.debug(f"RegisterNodes failed, reading with original NodeIds: {e}")
+            return node_ids
+    
+    async def _unregister_nodes(self):
+        """Release all node registrations made during discovery"""
+        if not self._registered_node_ids:
+            return
+        
+        try:
+            chunk_size = self.op_limits['MaxNodesPerRegisterNodes']
+            for i in range(0, len(self._registered_node_ids), chunk_size):
+                await self.client.uaclient.unregister_nodes(self._registered_node_ids[i:i + chunk_size])
+        except Exception as e:
+            logger.debug(f"Failed to unregister nodes: {e}")
+        finally:
+            self._registered_node_ids = []
+    
+    async def _data_type_names(self, data_type_ids: List[Optional[ua.NodeId]]) -> Dict[ua.NodeId, str]:
+        """Map data type NodeIds to their names using one batched read"""
+        unique_ids = list({data_type_id for data_type_id in data_type_ids if data_type_id is not None})
+        if not unique_ids:
+            return {}
+        
+        names = await self._read_attributes(unique_ids, [ua.AttributeIds.BrowseName])
+        return {data_type_id: _text(_value_of(dv)) for data_type_id, dv in zip(unique_ids, names)}
+    
+    async def _read_node_details(self, node_ids: List[ua.NodeId]) -> List[Dict[str, Any]]:
+        """Read browse name, display name, node class and data type for a list of nodes"""
+        if not node_ids:
+            return []
+        
+        attribute_ids = [ua.AttributeIds.BrowseName, ua.AttributeIds.DisplayName,
+                         ua.AttributeIds.NodeClass, ua.AttributeIds.DataType]
+        values = [_value_of(dv) for dv in await self._read_attributes(node_ids, attribute_ids)]
+        
+        details = []
+        for i in range(0, len(values), len(attribute_ids)):
+            browse_name, display_name, node_class, data_type = values[i:i + len(attribute_ids)]
+            details.append({
+                'browse_name': browse_name,
+                'display_name': display_name,
+                'node_class': ua.NodeClass(node_class) if node_class is not None else None,
+                'data_type': data_type if node_class == ua.NodeClass.Variable else None
+            })
+        
+        data_type_names = await self._data_type_names([d['data_type'] for d in details])
+        for d in details:
+            d['data_type'] = data_type_names.get(d['data_type'])
+        return details
+    
     async def discover_endpoints(self):
         """Discover available endpoints and security policies"""
         try:
             logger.info("Discovering endpoints...")
             
-            # Create temporary client with no security to get endpoints
-            temp_client = Client(url=self.endpoint)
-            temp_client.set_security_string("None")
-            await temp_client.connect()
-            
-            endpoints = await temp_client.get_endpoints()
-            await temp_client.disconnect()
+            if self._connected:
+                # GetEndpoints is a discovery service; the open session can answer it
+                endpoints = await self.client.get_endpoints()
+            else:
+                # Hello + unsecured SecureChannel only, no session to create/activate
+                endpoints = await Client(url=self.endpoint).connect_and_get_server_endpoints()
             
             logger.info(f"Found {len(endpoints)} endpoints:")
             for i, endpoint in enumerate(endpoints):
@@ -103,122 +380,209 @@ class OPCUANodeDiscovery:
             logger.error(f"Failed to discover namespaces: {e}")
             return []
     
-    async def browse_node(self, node_id: str, depth: int = 0, max_depth: int = 3) -> Dict[str, Any]:
-        """Recursively browse a node and its children"""
+    async def browse_node(self, node: Union[ua.NodeId, Node, str], depth: int = 0, max_depth: int = 3,
+                          output_file=None) -> Optional[NodeRecord]:
+        """Browse a node and its children breadth-first, one batched Browse per tree level
+        
+        Discovered nodes are appended to self.records; the tree is kept as record
+        indices (NodeRecord.parent and self.children_idx) rather than nested dicts.
+        If output_file (an aiofiles binary file) is given, each level is streamed
+        to it as NDJSON as soon as it has been read.
+        NodeIds are only turned into strings for the records themselves.
+        Returns the record of the browsed node itself.
+        """
         if depth > max_depth:
-            return {}
+            return None
         
         try:
-            node = await self.client.get_node(node_id)
-            
-            # Get node information
-            node_info = {
-                'node_id': str(node_id),
-                'browse_name': await node.read_browse_name(),
-                'display_name': await node.read_display_name(),
-                'node_class': await node.read_node_class(),
-                'data_type': None,
-                'children': []
-            }
-            
-            # Get data type for variables
-            if node_info['node_class'] == ua.NodeClass.Variable:
-                try:
-                    data_type_node = await node.read_data_type()
-                    node_info['data_type'] = await data_type_node.read_browse_name()
-                except:
-                    pass
-            
-            # Print current node
-            indent = "  " * depth
-            logger.info(f"{indent}• {node_info['browse_name']} ({node_info['node_id']})")
-            logger.info(f"{indent}  Class: {node_info['node_class']}")
-            if node_info['data_type']:
-                logger.info(f"{indent}  Type: {node_info['data_type']}")
-            if node_info['display_name']:
-                logger.info(f"{indent}  Display: {node_info['display_name']}")
-            
-            # Browse children
-            try:
-                children = await node.get_children()
-                for child in children:
-                    child_info = await self.browse_node(
-                        str(child.nodeid), 
-                        depth + 1, 
-                        max_depth
-                    )
-                    if child_info:
-                        node_info['children'].append(child_info)
-            except Exception as e:
-                logger.warning(f"{indent}  Failed to browse children: {e}")
+            if isinstance(node, Node):
+                root_id = node.nodeid
+            elif isinstance(node, str):
+                root_id = ua.NodeId.from_string(node)
+            else:
+                root_id = node
+            
+            details = (await self._read_node_details([root_id]))[0]
+            root_index = self._add_record(NodeRecord(
+                node_id=root_id.to_string(),
+                browse_name=_text(details['browse_name']),
+                display_name=_text(details['display_name']),
+                node_class=details['node_class'],
+                data_type=details['data_type'],
+                parent=-1
+            ))
+            await self._write_records(output_file, [root_index])
+            
+            level = [(root_id, root_index)]
+            for _ in range(depth, max_depth):
+                if not level:
+                    break
+                
+                # Browse results already carry names and node class; only the
+                # data type of variables needs a separate (batched) read
+                references = await self._browse_references([nid for nid, _ in level])
+                
+                next_level = []
+                for (_, parent_index), refs in zip(level, references):
+                    for ref in refs:
+                        index = self._add_record(NodeRecord(
+                            node_id=ref.NodeId.to_string(),
+                            browse_name=_text(ref.BrowseName),
+                            display_name=_text(ref.DisplayName),
+                            node_class=ref.NodeClass,
+                            data_type=None,
+                            parent=parent_index
+                        ))
+                        next_level.append((ref.NodeId, index))
+                
+                variables = [(nid, index) for nid, index in next_level
+                             if self.records[index].node_class == ua.NodeClass.Variable]
+                if variables:
+                    data_types = [_value_of(dv) for dv in await self._read_attributes(
+                        [nid for nid, _ in variables], [ua.AttributeIds.DataType]
+                    )]
+                    data_type_names = await self._data_type_names(data_types)
+                    for (_, index), data_type in zip(variables, data_types):
+                        self.records[index].data_type = data_type_names.get(data_type)
+                
+                await self._write_records(output_file, [index for _, index in next_level])
+                level = next_level
             
-            return node_info
+            # Records are the result; the per-node tree log is opt-in
+            if self.verbose_tree and logger.isEnabledFor(logging.INFO):
+                self._log_tree(root_index, depth)
+            else:
+                logger.info("Browsed %d nodes under %s", len(self.records) - root_index,
+                            self.records[root_index].browse_name)
+            return self.records[root_index]
             
         except Exception as e:
-            logger.error(f"Failed to browse node {node_id}: {e}")
-            return {}
+            logger.error(f"Failed to browse node {node}: {e}")
+            return None
+    
+    def _add_record(self, record: NodeRecord) -> int:
+        """Append a discovered node and link it to its parent, returning its index"""
+        index = len(self.records)
+        self.records.append(record)
+        self.children_idx.append([])
+        if record.parent >= 0:
+            self.children_idx[record.parent].append(index)
+        return index
+    
+    async def _write_records(self, output_file, indices: List[int]):
+        """Append records to an NDJSON output file in one write"""
+        if output_file is not None and indices:
+            await output_file.write(b"".join(_encode_record(self.records[index]) for index in indices))
     
-    async def discover_objects_folder(self, max_depth: int = 3):
+    def _log_tree(self, index: int, depth: int = 0):
+        """Print a browsed subtree"""
+        record = self.records[index]
+        indent = INDENTS[depth] if depth < len(INDENTS) else "  " * depth
+        logger.info("%s• %s (%s)", indent, record.browse_name, record.node_id)
+        logger.info("%s  Class: %s", indent, record.node_class)
+        if record.data_type:
+            logger.info("%s  Type: %s", indent, record.data_type)
+        if record.display_name:
+            logger.info("%s  Display: %s", indent, record.display_name)
+        for child_index in self.children_idx[index]:
+            self._log_tree(child_index, depth + 1)
+    
+    async def discover_objects_folder(self, max_depth: int = 3, output_file=None) -> Optional[NodeRecord]:
         """Discover the Objects folder and its contents"""
         try:
             logger.info("Discovering Objects folder...")
+            await self._await_preload()
             
             # Get Objects folder
             objects = self.client.get_objects_node()
-            objects_info = await self.browse_node(str(objects.nodeid), 0, max_depth)
+            objects_record = await self.browse_node(objects.nodeid, 0, max_depth, output_file)
             
-            return objects_info
+            return objects_record
             
         except Exception as e:
             logger.error(f"Failed to discover Objects folder: {e}")
-            return {}
+            return None
     
-    async def find_nodes_by_type(self, node_type: str = "Variable") -> List[Dict[str, Any]]:
-        """Find all nodes of a specific type"""
+    async def find_nodes_by_type(self, node_type: str = "Variable",
+                                 live_snapshot: bool = False) -> List[Dict[str, Any]]:
+        """Find all nodes of a specific type
+        
+        With live_snapshot, current values of variables are collected from the
+        initial notifications of a temporary subscription instead of a Read.
+        """
         try:
             logger.info(f"Finding all {node_type} nodes...")
+            await self._await_preload()
             
             found_nodes = []
             
             # Start from Objects folder
             objects = self.client.get_objects_node()
             
-            async def search_recursive(node, depth=0):
-                if depth > 5:  # Limit search depth
-                    return
-                
-                try:
-                    node_class = await node.read_node_class()
-                    
-                    if node_type.lower() in str(node_class).lower():
-                        node_info = {
-                            'node_id': str(node.nodeid),
-                            'browse_name': await node.read_browse_name(),
-                            'display_name': await node.read_display_name(),
-                            'node_class': node_class
-                        }
-                        
-                        # Get data type for variables
-                        if node_class == ua.NodeClass.Variable:
-                            try:
-                                data_value = await node.read_value()
-                                node_info['current_value'] = data_value
-                                node_info['value_type'] = type(data_value).__name__
-                            except:
-                                pass
-                        
-                        found_nodes.append(node_info)
-                        logger.info(f"  Found: {node_info['browse_name']} ({node_info['node_id']})")
-                    
-                    # Recursively search children
-                    children = await node.get_children()
-                    for child in children:
-                        await search_recursive(child, depth + 1)
-                        
-                except Exception as e:
-                    logger.debug(f"Error searching node: {e}")
-            
-            await search_recursive(objects)
+            def matches(node_class) -> bool:
+                return node_class is not None and node_type.lower() in node_class.name.lower()
+            
+            def record(node_id, browse_name, display_name, node_class):
+                node_info = {
+                    'node_id': node_id.to_string(),
+                    'browse_name': browse_name,
+                    'display_name': display_name,
+                    'node_class': node_class
+                }
+                found_nodes.append(node_info)
+                if self.verbose_tree:
+                    logger.info("  Found: %s (%s)", browse_name, node_info['node_id'])
+                return node_info
+            
+            root_details = (await self._read_node_details([objects.nodeid]))[0]
+            matched = []
+            if matches(root_details['node_class']):
+                matched.append((objects.nodeid, record(objects.nodeid, root_details['browse_name'],
+                                                       root_details['display_name'],
+                                                       root_details['node_class'])))
+            
+            # Follow the instance tree plus whatever class is being searched for
+            node_class_mask = self.node_class_mask
+            for node_class in ua.NodeClass:
+                if matches(node_class):
+                    node_class_mask |= node_class
+            
+            def on_reference(ref: ua.ReferenceDescription):
+                if matches(ref.NodeClass):
+                    matched.append((ref.NodeId, record(ref.NodeId, ref.BrowseName,
+                                                       ref.DisplayName, ref.NodeClass)))
+            
+            # Work queue drained by a fixed pool of workers, each browsing
+            # whatever has queued up as one batch (depth limited to 5)
+            queue: asyncio.Queue = asyncio.Queue()
+            queue.put_nowait((objects.nodeid, 0))
+            workers = [
+                asyncio.create_task(self._search_worker(queue, 5, on_reference, node_class_mask))
+                for _ in range(self.search_workers)
+            ]
+            try:
+                await queue.join()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+            
+            # Current values for matched variables in one batched read
+            variables = [(nid, info) for nid, info in matched if info['node_class'] == ua.NodeClass.Variable]
+            if variables and live_snapshot:
+                snapshot = await self._snapshot_values([nid for nid, _ in variables])
+                for node_id, node_info in variables:
+                    if node_id in snapshot:
+                        node_info['current_value'] = snapshot[node_id]
+                        node_info['value_type'] = type(snapshot[node_id]).__name__
+            elif variables:
+                read_ids = await self._register_nodes([nid for nid, _ in variables])
+                values = await self._read_attributes(read_ids, [ua.AttributeIds.Value])
+                for (_, node_info), dv in zip(variables, values):
+                    if dv.StatusCode.is_good():
+                        data_value = _value_of(dv)
+                        node_info['current_value'] = data_value
+                        node_info['value_type'] = type(data_value).__name__
             
             logger.info(f"Found {len(found_nodes)} {node_type} nodes")
             return found_nodes
@@ -227,23 +591,82 @@ class OPCUANodeDiscovery:
             logger.error(f"Failed to find nodes by type: {e}")
             return []
     
-    async def monitor_node(self, node_id: str, duration: int = 10):
-        """Monitor a specific node for changes"""
+    async def _subscribe_data_change(self, subscription, nodes: List, **kwargs) -> List:
+        """subscribe_data_change in chunks of the server's MaxMonitoredItemsPerCall"""
+        chunk_size = self.op_limits['MaxMonitoredItemsPerCall']
+        handles = []
+        for i in range(0, len(nodes), chunk_size):
+            handles.extend(await subscription.subscribe_data_change(nodes[i:i + chunk_size], **kwargs))
+        return handles
+    
+    async def _snapshot_values(self, node_ids: List[ua.NodeId], timeout: float = 5.0) -> Dict[ua.NodeId, Any]:
+        """Collect current values through one subscription's initial data change notifications"""
+        handler = DataChangeHandler(log_changes=False, expected_count=len(node_ids))
+        subscription = await self.client.create_subscription(self.snapshot_publishing_interval, handler)
         try:
-            logger.info(f"Monitoring node {node_id} for {duration} seconds...")
+            # Batched CreateMonitoredItems requests; the server reports each
+            # item's current value in the first publish
+            handles = await self._subscribe_data_change(
+                subscription,
+                [self.client.get_node(node_id) for node_id in node_ids],
+                sampling_interval=0
+            )
+            # Items the server rejected (returned as StatusCodes) will never report
+            handler.set_expected_count(sum(1 for handle in handles if isinstance(handle, int)))
+            try:
+                await asyncio.wait_for(handler.complete.wait(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Live snapshot received {len(handler.values)} of {len(node_ids)} values")
+        finally:
+            await subscription.delete()
+        
+        return handler.values
+    
+    async def _search_worker(self, queue: asyncio.Queue, max_depth: int, on_reference,
+                             node_class_mask: Optional[int] = None):
+        """Take (node_id, depth) items off the queue in batches, browse them and queue their children"""
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.op_limits['MaxNodesPerBrowse']:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
             
-            node = await self.client.get_node(node_id)
+            try:
+                references = await self._browse_references([node_id for node_id, _ in batch], node_class_mask)
+                for (_, depth), refs in zip(batch, references):
+                    for ref in refs:
+                        on_reference(ref)
+                        if depth + 1 < max_depth:
+                            queue.put_nowait((ref.NodeId, depth + 1))
+            except Exception as e:
+                logger.debug("Error searching node: %s", e)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+    
+    async def monitor_node(self, node_ids: Union[str, List[str]], duration: int = 10):
+        """Monitor one or more nodes for changes through a single subscription"""
+        try:
+            if isinstance(node_ids, str):
+                node_ids = [node_ids]
+            
+            logger.info(f"Monitoring {len(node_ids)} node(s) for {duration} seconds...")
             
-            # Read initial value
-            initial_value = await node.read_value()
-            logger.info(f"Initial value: {initial_value}")
+            nodes = [self.client.get_node(node_id) for node_id in node_ids]
+            
+            # Read initial values
+            initial_values = await self._read_attributes([node.nodeid for node in nodes], [ua.AttributeIds.Value])
+            for node_id, dv in zip(node_ids, initial_values):
+                logger.info(f"Initial value of {node_id}: {_value_of(dv)}")
             
             # Create subscription
             handler = DataChangeHandler()
             subscription = await self.client.create_subscription(1000, handler)
             
-            # Subscribe to node
-            await subscription.subscribe_data_change(node)
+            # Subscribe to all nodes with as few requests as the server allows
+            await self._subscribe_data_change(subscription, nodes)
             
             # Monitor for specified duration
             await asyncio.sleep(duration)
@@ -260,32 +683,54 @@ class OPCUANodeDiscovery:
         """Disconnect from OPC UA server"""
         try:
             if self.client:
+                if self._preload_task is not None:
+                    self._preload_task.cancel()
+                    self._preload_task = None
+                await self._unregister_nodes()
+                self._connected = False
                 await self.client.disconnect()
                 logger.info("Disconnected from OPC UA server")
         except Exception as e:
             logger.error(f"Error during disconnect: {e}")
     
-    async def run_discovery(self, max_depth: int = 3, monitor_node: Optional[str] = None):
-        """Run complete discovery process"""
-        try:
-            # Connect
-            if not await self.connect():
-                return
-            
-            # Discover endpoints
-            await self.discover_endpoints()
-            
-            # Discover namespaces
-            await self.discover_namespaces()
-            
-            # Discover Objects folder
+    async def _post_connect_phase(self, max_depth: int, live_snapshot: bool,
+                                  output_path: Optional[str]) -> bool:
+        """Connect, then discover namespaces, the Objects folder and variables in order"""
+        # Connect
+        if not await self.connect():
+            return False
+        
+        # Discover namespaces
+        await self.discover_namespaces()
+        
+        # Discover Objects folder
+        if output_path:
+            async with aiofiles.open(output_path, 'wb') as output_file:
+                await self.discover_objects_folder(max_depth, output_file)
+            logger.info(f"Wrote discovered nodes to {output_path}")
+        else:
             await self.discover_objects_folder(max_depth)
-            
-            # Find all variables
-            await self.find_nodes_by_type("Variable")
+        
+        # Find all variables
+        await self.find_nodes_by_type("Variable", live_snapshot=live_snapshot)
+        return True
+    
+    async def run_discovery(self, max_depth: int = 3, monitor_node: Optional[Union[str, List[str]]] = None,
+                            live_snapshot: bool = False, output_path: Optional[str] = None):
+        """Run complete discovery process
+        
+        If output_path is given, the Objects folder tree is streamed there as NDJSON.
+        """
+        try:
+            # Endpoint discovery uses its own connection, so it runs alongside
+            # the main session's handshake and browsing
+            _, connected = await asyncio.gather(
+                self.discover_endpoints(),
+                self._post_connect_phase(max_depth, live_snapshot, output_path)
+            )
             
             # Monitor specific node if requested
-            if monitor_node:
+            if connected and monitor_node:
                 await self.monitor_node(monitor_node)
             
         except KeyboardInterrupt:
@@ -296,14 +741,53 @@ class OPCUANodeDiscovery:
             await self.disconnect()
 
 
+def _encode_record(record: NodeRecord) -> bytes:
+    """One NDJSON line for a NodeRecord"""
+    return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def _text(value: Any) -> Optional[str]:
+    """Plain string for a QualifiedName / LocalizedText attribute value"""
+    if value is None:
+        return None
+    if isinstance(value, ua.QualifiedName):
+        return value.Name
+    if isinstance(value, ua.LocalizedText):
+        return value.Text
+    return str(value)
+
+
+def _value_of(data_value: ua.DataValue) -> Any:
+    """Unwrap a DataValue returned by a Read, None if the read failed"""
+    if data_value.StatusCode.is_good() and data_value.Value is not None:
+        return data_value.Value.Value
+    return None
+
+
 class DataChangeHandler:
     """Handler for data change notifications during discovery"""
     
-    def datachange_notification(self, event):
+    def __init__(self, log_changes: bool = True, expected_count: int = 0):
+        self.log_changes = log_changes
+        self.expected_count = expected_count
+        self.values: Dict[ua.NodeId, Any] = {}
+        self.complete = asyncio.Event()  # Set once every expected node has reported
+    
+    def set_expected_count(self, expected_count: int):
+        """Adjust how many nodes must report before the handler is complete"""
+        self.expected_count = expected_count
+        if len(self.values) >= expected_count:
+            self.complete.set()
+    
+    def datachange_notification(self, node, val, data):
         """Handle data change notifications"""
         try:
-            for item in event.monitored_items:
-                logger.info(f"  Value changed: {item.Value.Value} (Quality: {item.Value.StatusCode})")
+            self.values[node.nodeid] = val
+            if self.log_changes:
+                logger.info(f"  Value changed: {node.nodeid.to_string()} = {val} "
+                            f"(Quality: {data.monitored_item.Value.StatusCode})")
+            if self.expected_count and len(self.values) >= self.expected_count:
+                self.complete.set()
         except Exception as e:
             logger.error(f"Error in data change notification: {e}")
 
@@ -316,9 +800,16 @@ async def main():
                        help='Security policy (None, Basic256Sha256, etc.)')
     parser.add_argument('--max-depth', type=int, default=3,
                        help='Maximum depth for recursive browsing (default: 3)')
-    parser.add_argument('--monitor-node', help='Monitor specific node ID for changes')
+    parser.add_argument('--monitor-node', action='append',
+                       help='Monitor node ID for changes (repeat to monitor several in one subscription)')
+    parser.add_argument('--output', '-o',
+                       help='Write the discovered Objects tree to this file as NDJSON')
+    parser.add_argument('--live-snapshot', action='store_true',
+                       help='Collect variable values from a subscription instead of a Read')
     parser.add_argument('--verbose', '-v', action='store_true',
                        help='Enable verbose logging')
+    parser.add_argument('--verbose-tree', action='store_true',
+                       help='Print every discovered node as a tree instead of summaries')
     
     args = parser.parse_args()
     
@@ -326,13 +817,21 @@ async def main():
         logging.getLogger().setLevel(logging.DEBUG)
     
     # Create discovery instance
-    discovery = OPCUANodeDiscovery(args.endpoint, args.security_policy)
+    discovery = OPCUANodeDiscovery(args.endpoint, args.security_policy, args.verbose_tree)
     
     # Run discovery
-    await discovery.run_discovery(args.max_depth, args.monitor_node)
+    await discovery.run_discovery(args.max_depth, args.monitor_node, args.live_snapshot, args.output)
 
 
 if __name__ == "__main__":
+    # uvloop handles the many small socket reads/awaits of a discovery run
+    # faster than the default loop; optional, not available on Windows
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
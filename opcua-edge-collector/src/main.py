@@ -2,32 +2,26 @@
 
 import asyncio
 import logging
+import multiprocessing
+import os
+import queue
 import signal
 import sys
+import time
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
-from pathlib import Path
-from typing import Dict, List, Optional, Any
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional, Any, Tuple
 
-# Add parent directory to path for common models
-sys.path.append(str(Path(__file__).parent.parent.parent / "common"))
-
-from data_models import BridgeConfiguration, AssetConfiguration, TelemetryPoint
+from common.data_models import BridgeConfiguration, AssetConfiguration, TelemetryPoint
 from config import load_config, get_connection_settings
 from opcua_client import OPCUAClient
-from analytics_processor import AnalyticsProcessor
+from analytics_processor import init_analytics_worker, run_analytics_batch, get_analytics_status
 from data_buffer import DataBuffer, get_data_buffer
 from cloud_sender import InfluxDBCloudSender, create_influxdb_sender
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('edge_collector.log')
-    ]
-)
+from line_protocol import fast_encode
 
 logger = logging.getLogger(__name__)
 
@@ -41,20 +35,45 @@ class EdgeCollectorOrchestrator:
         
         # Components
         self.opcua_client: Optional[OPCUAClient] = None
-        self.analytics_processors: Dict[str, AnalyticsProcessor] = {}
+        # Analytics processors live in worker processes; each pool owns a fixed set of assets
+        self._pool_assets: Dict[ProcessPoolExecutor, List[AssetConfiguration]] = {}
+        self._asset_pools: Dict[str, ProcessPoolExecutor] = {}
         self.data_buffer: Optional[DataBuffer] = None
         self.cloud_sender: Optional[InfluxDBCloudSender] = None
         
         # Runtime state
         self.is_running = False
         self.shutdown_event = asyncio.Event()
+        self._opcua_task: Optional[asyncio.Task] = None
+        self._stop_task: Optional[asyncio.Task] = None
+        self._stop_called = False
+        self._stopped = asyncio.Event()
+        self._tasks_started = False
+        self._tasks_done = asyncio.Event()  # Set once the task group has fully exited
+        
+        # Wakes the buffer sender once enough points are pending
+        self._flush_cond = asyncio.Condition()
+        self._pending_points = 0
+        
+        # Ingest queues between OPC UA callbacks and the buffer writers, sharded by asset so
+        # each asset has a single writer and its points are buffered in collection order
+        self._ingest_queues: List[asyncio.Queue] = []
+        self._asset_queues: Dict[str, asyncio.Queue] = {}
+        self._dropped_points = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         
         # Configuration
-        self.buffer_send_interval = 30  # seconds
-        self.buffer_batch_size = 100
-        self.analytics_batch_size = 50
+        self.buffer_send_interval = 30  # seconds, idle flush interval
+        self.flush_high_water_mark = 1000  # pending points that trigger an early send
+        self.max_batch_points = 5000  # Influx recommended points per write
+        self.max_batch_bytes = 1_000_000
+        self.buffer_page_size = 1000
         self.max_retry_attempts = 3
-        self.retry_delay = 5  # seconds
+        self.retry_delays = (1, 5, 25)  # seconds, exponential backoff
+        self.ingest_batch_size = 500
+        self.ingest_flush_interval = 0.05  # seconds
+        self.ingest_workers = max(2, (os.cpu_count() or 1) // 2)  # Upper bound; one per asset at most
+        self.ingest_queue_size = 10000  # Points, shared across the shards
         
         logger.info("Edge Collector Orchestrator initialized")
     
@@ -63,6 +82,10 @@ class EdgeCollectorOrchestrator:
         try:
             logger.info("Initializing Edge Collector components...")
             
+            # OPC UA callbacks may fire off the loop thread; keep the loop to hand points over
+            self._loop = asyncio.get_running_loop()
+            self._install_signal_handlers()
+            
             # Load configuration
             await self._load_configuration()
             
@@ -78,6 +101,9 @@ class EdgeCollectorOrchestrator:
             # Initialize analytics processors
             await self._initialize_analytics_processors()
             
+            # Initialize ingest queues
+            self._initialize_ingest_queues()
+            
             logger.info("All components initialized successfully")
             
         except Exception as e:
@@ -87,7 +113,8 @@ class EdgeCollectorOrchestrator:
     async def _load_configuration(self):
         """Load configuration with environment variable overrides"""
         try:
-            self.config = load_config()
+            # Parse off the event loop so concurrent tasks are not stalled by file I/O
+            self.config = await asyncio.to_thread(load_config)
             logger.info(f"Configuration loaded: {self.config.enterprise_name}")
         except Exception as e:
             logger.error(f"Failed to load configuration: {e}")
@@ -139,42 +166,185 @@ class EdgeCollectorOrchestrator:
             if not self.config:
                 raise ValueError("Configuration not loaded")
             
-            for site in self.config.sites:
-                for asset in site.assets:
-                    processor = AnalyticsProcessor(asset)
-                    self.analytics_processors[asset.asset_name] = processor
-                    logger.info(f"Analytics processor initialized for {asset.asset_name}")
+            # Analytics run in worker processes to stay off the GIL; each asset is
+            # pinned to one single-process pool so its rolling state lives in one place
+            assets = [asset for site in self.config.sites for asset in site.assets]
+            pool_count = min(os.cpu_count() or 1, len(assets))
+            for i in range(pool_count):
+                self._start_analytics_pool(assets[i::pool_count])
             
-            logger.info(f"Initialized {len(self.analytics_processors)} analytics processors")
+            logger.info(f"Initialized analytics for {len(assets)} assets in {pool_count} worker processes")
         except Exception as e:
             logger.error(f"Failed to initialize analytics processors: {e}")
             raise
     
-    def _handle_telemetry_data(self, telemetry_point: TelemetryPoint):
-        """Handle incoming telemetry data"""
+    def _initialize_ingest_queues(self):
+        """Create one ingest queue per worker and assign each asset to exactly one of them"""
+        assets = [asset for site in self.config.sites for asset in site.assets]
+        shard_count = max(1, min(self.ingest_workers, len(assets)))
+        self._ingest_queues = [
+            asyncio.Queue(maxsize=self.ingest_queue_size // shard_count) for _ in range(shard_count)
+        ]
+        for i, asset in enumerate(assets):
+            self._asset_queues[asset.asset_name] = self._ingest_queues[i % shard_count]
+        logger.info(f"Initialized {shard_count} ingest queues for {len(assets)} assets")
+    
+    def _start_analytics_pool(self, assets: List[AssetConfiguration]) -> ProcessPoolExecutor:
+        """Start a single-process analytics pool that owns the given assets"""
+        # Spawned rather than forked: the parent already runs the log listener
+        # and aiosqlite threads, which must not be copied into the workers
+        pool = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_analytics_worker,
+            initargs=(assets,)
+        )
+        self._pool_assets[pool] = assets
+        for asset in assets:
+            self._asset_pools[asset.asset_name] = pool
+        return pool
+    
+    def _replace_broken_pool(self, pool: ProcessPoolExecutor):
+        """Replace a pool whose worker process died with a fresh one for the same assets"""
+        assets = self._pool_assets.pop(pool, None)
+        if assets is None:
+            return  # Already replaced after an earlier failure
+        pool.shutdown(wait=False)
+        asset_names = [asset.asset_name for asset in assets]
+        logger.warning(f"Analytics worker for {asset_names} died, restarting it; its rolling state is reset")
+        self._start_analytics_pool(assets)
+    
+    async def _run_analytics(self, pool: ProcessPoolExecutor, func, *args):
+        """Run func in an analytics pool, replacing the pool if its worker process died"""
         try:
-            # This is called from the OPC UA client callback
-            # We need to handle this asynchronously
-            asyncio.create_task(self._process_telemetry_async(telemetry_point))
+            return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+        except BrokenProcessPool:
+            self._replace_broken_pool(pool)
+            raise
+    
+    def _handle_telemetry_data(self, telemetry_points: List[TelemetryPoint]):
+        """Handle a batch of incoming telemetry data"""
+        try:
+            # This is called from the OPC UA client callback; just enqueue and
+            # let the ingest workers batch the writes
+            try:
+                on_loop = asyncio.get_running_loop() is self._loop
+            except RuntimeError:
+                on_loop = False
+            
+            if on_loop:
+                self._enqueue_points(telemetry_points)
+            else:
+                self._loop.call_soon_threadsafe(self._enqueue_points, telemetry_points)
         except Exception as e:
             logger.error(f"Error handling telemetry data: {e}")
     
-    async def _process_telemetry_async(self, telemetry_point: TelemetryPoint):
-        """Process telemetry point asynchronously"""
+    def _enqueue_points(self, telemetry_points: List[TelemetryPoint]):
+        """Put points on their asset's ingest queue, dropping the oldest ones when full"""
+        asset_queues = self._asset_queues
+        default_queue = self._ingest_queues[0]
         try:
-            # Process with analytics
-            if telemetry_point.machine in self.analytics_processors:
-                processor = self.analytics_processors[telemetry_point.machine]
-                analytics_results = await processor.process_telemetry_point(telemetry_point)
+            for telemetry_point in telemetry_points:
+                ingest_queue = asset_queues.get(telemetry_point.machine, default_queue)
+                try:
+                    ingest_queue.put_nowait(telemetry_point)
+                except asyncio.QueueFull:
+                    # Backpressure: drop the oldest point so fresh data keeps flowing
+                    ingest_queue.get_nowait()
+                    ingest_queue.put_nowait(telemetry_point)
+                    self._dropped_points += 1
+                    if self._dropped_points % 1000 == 1:
+                        logger.warning(f"Ingest queue full, dropped {self._dropped_points} points so far")
+        except Exception as e:
+            logger.error(f"Error enqueueing telemetry points: {e}")
+    
+    async def _ingest_consumer_loop(self, ingest_queue: asyncio.Queue):
+        """Drain one ingest queue and write telemetry to the buffer in batches"""
+        logger.debug("Starting ingest consumer loop")
+        loop = asyncio.get_running_loop()
+        process_batch = self._process_telemetry_async
+        
+        while self._ingest_open() or not ingest_queue.empty():
+            try:
+                try:
+                    first = await asyncio.wait_for(ingest_queue.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+                
+                # Coalesce until the batch is full or the flush window closes
+                batch = [first]
+                deadline = loop.time() + self.ingest_flush_interval
+                while len(batch) < self.ingest_batch_size:
+                    try:
+                        batch.append(ingest_queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        remaining = deadline - loop.time()
+                        if remaining <= 0:
+                            break
+                        try:
+                            batch.append(await asyncio.wait_for(ingest_queue.get(), timeout=remaining))
+                        except asyncio.TimeoutError:
+                            break
+                
+                await process_batch(batch)
                 
-                # Save analytics results to buffer
-                if analytics_results and analytics_results.get('analytics'):
-                    await self.data_buffer.save_analytics_result(analytics_results)
+            except Exception as e:
+                logger.error(f"Error in ingest consumer loop: {e}")
+        
+        logger.debug("Ingest consumer loop stopped")
+    
+    def _ingest_open(self) -> bool:
+        """True while points can still arrive: running, or the OPC UA client is still shutting down"""
+        return self.is_running or (self._opcua_task is not None and not self._opcua_task.done())
+    
+    async def _process_telemetry_async(self, telemetry_points: List[TelemetryPoint]):
+        """Run analytics over a batch of telemetry points and buffer them in one write"""
+        try:
+            # Group by asset so each worker process gets one submission per batch;
+            # one dict lookup per point, resolving the pool at the same time
+            pools = self._asset_pools
+            points_by_asset: Dict[str, Tuple[ProcessPoolExecutor, List[TelemetryPoint]]] = {}
+            for telemetry_point in telemetry_points:
+                entry = points_by_asset.get(telemetry_point.machine)
+                if entry is None:
+                    pool = pools.get(telemetry_point.machine)
+                    if pool is None:
+                        continue
+                    entry = points_by_asset[telemetry_point.machine] = (pool, [])
+                entry[1].append(telemetry_point)
+            
+            # Process with analytics; a failure only costs that asset's analytics,
+            # the raw telemetry is buffered regardless
+            asset_results = await asyncio.gather(*(
+                self._run_analytics(pool, run_analytics_batch, asset_name, points)
+                for asset_name, (pool, points) in points_by_asset.items()
+            ), return_exceptions=True)
+            analytics_results = []
+            for asset_name, results in zip(points_by_asset, asset_results):
+                if isinstance(results, Exception):
+                    logger.error(f"Analytics failed for {asset_name}: {results}")
+                else:
+                    analytics_results.extend(results)
             
-            # Save telemetry to buffer
-            await self.data_buffer.save_telemetry_point(telemetry_point)
+            # Encode line protocol once here; the send path only concatenates bytes
+            measurement = self.cloud_sender.telemetry_measurement
+            encoded = [(telemetry_point, fast_encode(telemetry_point, measurement))
+                       for telemetry_point in telemetry_points]
+            # NaN/inf values have no line protocol form and are never written; don't buffer them
+            telemetry_points = [telemetry_point for telemetry_point, line in encoded if line is not None]
+            encoded_lines = [line for _, line in encoded if line is not None]
             
-            logger.debug(f"Processed telemetry: {telemetry_point.machine}.{telemetry_point.tag}")
+            # Save telemetry and analytics to buffer
+            await self.data_buffer.save_telemetry_batch(telemetry_points, analytics_results, encoded_lines)
+            
+            self._pending_points += len(telemetry_points)
+            if self._pending_points >= self.flush_high_water_mark:
+                async with self._flush_cond:
+                    self._flush_cond.notify()
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Processed {len(telemetry_points)} telemetry points, "
+                             f"{len(analytics_results)} analytics results")
             
         except Exception as e:
             logger.error(f"Error processing telemetry: {e}")
@@ -183,93 +353,154 @@ class EdgeCollectorOrchestrator:
         """Main loop for sending buffered data to cloud"""
         logger.info("Starting buffer sender loop")
         
+        backlog = False
         while self.is_running:
             try:
-                # Wait for interval or shutdown
-                try:
-                    await asyncio.wait_for(
-                        self.shutdown_event.wait(), 
-                        timeout=self.buffer_send_interval
-                    )
+                # Wait for the high-water mark, the idle interval or shutdown;
+                # skip the wait while draining a backlog
+                if not backlog:
+                    async with self._flush_cond:
+                        try:
+                            await asyncio.wait_for(
+                                self._flush_cond.wait_for(self._flush_due),
+                                timeout=self.buffer_send_interval
+                            )
+                        except asyncio.TimeoutError:
+                            pass  # Idle flush
                     if self.shutdown_event.is_set():
                         break
-                except asyncio.TimeoutError:
-                    pass  # Continue with normal operation
+                self._pending_points = 0
                 
-                # Get telemetry batch
-                telemetry_batch = await self.data_buffer.get_telemetry_batch(
-                    batch_size=self.buffer_batch_size
+                # Fill one cloud write with buffered telemetry and analytics in insert order
+                rows, used_bytes = await self._collect_rows(
+                    self.data_buffer.get_batch,
+                    self.max_batch_points, self.max_batch_bytes
                 )
+                backlog = len(rows) >= self.max_batch_points or used_bytes >= self.max_batch_bytes
                 
-                # Get analytics batch
-                analytics_batch = await self.data_buffer.get_analytics_batch(
-                    batch_size=self.analytics_batch_size
-                )
+                # Split by kind only for serialization
+                telemetry_batch, analytics_batch = [], []
+                for row in rows:
+                    (analytics_batch if row['kind'] == 'analytics' else telemetry_batch).append(row)
                 
-                if telemetry_batch or analytics_batch:
+                if rows:
                     # Generate batch ID
                     batch_id = str(uuid.uuid4())
                     
-                    # Mark batch as being processed
-                    for item in telemetry_batch:
-                        item['batch_id'] = batch_id
-                    for item in analytics_batch:
-                        item['batch_id'] = batch_id
+                    # Tag the rows in the buffer; the row dicts stay untouched across retries
+                    if not await self.data_buffer.claim_batch(batch_id, [row['id'] for row in rows]):
+                        continue
                     
                     # Send to cloud with retry logic
-                    success = await self._send_batch_with_retry(
+                    outcome = await self._send_batch_with_retry(
                         telemetry_batch, analytics_batch, batch_id
                     )
                     
-                    if success:
-                        # Mark batch as processed and delete
-                        await self.data_buffer.mark_batch_processed(batch_id)
-                        await self.data_buffer.delete_batch(batch_id)
+                    if outcome == 'sent':
+                        # Drop the sent batch in one commit
+                        await self.data_buffer.finalize_batch(batch_id)
                         logger.info(f"Successfully sent and deleted batch {batch_id}")
+                    elif outcome == 'rejected':
+                        # Resending cannot succeed and would block every row behind it; quarantine
+                        # the rows as processed, kept for inspection until maintenance deletes them
+                        await self.data_buffer.mark_batch_processed(batch_id)
+                        logger.error(f"Quarantined rejected batch {batch_id}: {len(rows)} rows")
+                    elif outcome == 'too_large':
+                        if len(rows) > 1:
+                            # Shrink the write budget and resend the same rows in smaller batches
+                            self.max_batch_bytes = max(1, used_bytes // 2)
+                            logger.warning(f"Batch {batch_id} too large for InfluxDB ({used_bytes} bytes), "
+                                           f"lowering max_batch_bytes to {self.max_batch_bytes}")
+                        else:
+                            # A single line over the server limit can never be written
+                            await self.data_buffer.mark_batch_processed(batch_id)
+                            logger.error(f"Quarantined oversized batch {batch_id}: {used_bytes} bytes")
                     else:
                         logger.warning(f"Failed to send batch {batch_id}, will retry later")
+                        backlog = False
                 else:
                     logger.debug("No data to send")
                 
             except Exception as e:
                 logger.error(f"Error in buffer sender loop: {e}")
+                backlog = False
                 await asyncio.sleep(10)  # Wait before retrying
         
         logger.info("Buffer sender loop stopped")
     
+    def _flush_due(self) -> bool:
+        """Predicate for the sender condition: enough pending points or shutting down"""
+        return self._pending_points >= self.flush_high_water_mark or self.shutdown_event.is_set()
+    
+    async def _collect_rows(self, fetch, max_points: int, max_bytes: int):
+        """Page through the buffer with fetch until the point or byte budget is used up"""
+        rows: List[Dict[str, Any]] = []
+        used_bytes = 0
+        after_id = 0
+        while len(rows) < max_points and used_bytes < max_bytes:
+            page = await fetch(
+                batch_size=min(max_points - len(rows), self.buffer_page_size),
+                after_id=after_id
+            )
+            if not page:
+                break
+            for row in page:
+                rows.append(row)
+                # Wire size: exact for pre-encoded lines, rough for the rest
+                encoded = row.get('line_protocol')
+                used_bytes += len(encoded) if encoded else sum(len(str(v)) for v in row.values())
+                if used_bytes >= max_bytes:
+                    break
+            after_id = rows[-1]['id']
+        return rows, used_bytes
+    
     async def _send_batch_with_retry(self, telemetry_batch: List[Dict], 
                                    analytics_batch: List[Dict], 
-                                   batch_id: str) -> bool:
-        """Send batch with retry logic"""
+                                   batch_id: str) -> str:
+        """Send batch with retry logic; returns 'sent', 'rejected' (not retryable), 'too_large' or 'failed'"""
         for attempt in range(self.max_retry_attempts):
             try:
-                # Test connection before sending
-                if not await self.cloud_sender.test_connection():
-                    logger.warning(f"InfluxDB connection test failed, attempt {attempt + 1}")
-                    if attempt < self.max_retry_attempts - 1:
-                        await asyncio.sleep(self.retry_delay)
-                        continue
-                    else:
-                        return False
-                
-                # Send batch
+                # Send speculatively; the link is only probed after a failure
                 success = await self.cloud_sender.send_mixed_batch(
-                    telemetry_batch, analytics_batch
+                    telemetry_batch, analytics_batch, batch_id=batch_id
                 )
                 
                 if success:
-                    return True
+                    return 'sent'
+                
+                error = self.cloud_sender.last_error
+                failure = self.cloud_sender.classify_error(error)
+                if failure == 'client':
+                    # The response body says which line or field InfluxDB refused
+                    logger.error(f"Batch {batch_id} rejected by InfluxDB, not retrying: "
+                                 f"{getattr(error, 'message', None) or error}")
+                    return 'rejected'
+                if failure == 'too_large':
+                    return 'too_large'
+                
+                if failure == 'config':
+                    # Auth, permission or bucket problem: keep the rows and back off until it is fixed
+                    logger.error(f"Failed to send batch {batch_id} ({failure} error), attempt {attempt + 1}: "
+                                 f"{getattr(error, 'message', None) or error}")
                 else:
-                    logger.warning(f"Failed to send batch {batch_id}, attempt {attempt + 1}")
-                    if attempt < self.max_retry_attempts - 1:
-                        await asyncio.sleep(self.retry_delay)
+                    logger.warning(f"Failed to send batch {batch_id} ({failure} error), attempt {attempt + 1}")
                 
             except Exception as e:
+                failure = 'connection'
                 logger.error(f"Error sending batch {batch_id}, attempt {attempt + 1}: {e}")
-                if attempt < self.max_retry_attempts - 1:
-                    await asyncio.sleep(self.retry_delay)
+            
+            if self.shutdown_event.is_set():
+                # Don't hold up shutdown; the rows stay buffered and are resent on the next start
+                break
+            
+            if attempt < self.max_retry_attempts - 1:
+                await asyncio.sleep(self.retry_delays[min(attempt, len(self.retry_delays) - 1)])
+                
+                # Connection-level failure: make sure the link is back before resending
+                if failure == 'connection' and not await self.cloud_sender.test_connection():
+                    logger.warning(f"InfluxDB connection test failed, attempt {attempt + 1}")
         
-        return False
+        return 'failed'
     
     async def _health_monitor_loop(self):
         """Health monitoring and maintenance loop"""
@@ -309,8 +540,9 @@ class EdgeCollectorOrchestrator:
         health_status = {
             'overall': 'healthy',
             'components': {},
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': None
         }
+        checked_at = time.time()
         
         try:
             # Check OPC UA client
@@ -341,17 +573,11 @@ class EdgeCollectorOrchestrator:
                 health_status['components']['cloud_sender'] = 'unhealthy'
                 health_status['overall'] = 'degraded'
             
-            # Check analytics processors
-            healthy_processors = 0
-            for asset_name, processor in self.analytics_processors.items():
-                try:
-                    status = processor.get_status()
-                    if status:
-                        healthy_processors += 1
-                except:
-                    pass
+            # Check analytics processors; their state lives in the worker processes
+            analytics_status = await self._get_analytics_status()
+            health_status['analytics_status'] = analytics_status
             
-            if healthy_processors == len(self.analytics_processors):
+            if all(analytics_status.values()):
                 health_status['components']['analytics_processors'] = 'healthy'
             else:
                 health_status['components']['analytics_processors'] = 'degraded'
@@ -361,15 +587,32 @@ class EdgeCollectorOrchestrator:
             health_status['overall'] = 'error'
             health_status['error'] = str(e)
         
+        health_status['timestamp'] = datetime.utcfromtimestamp(checked_at).isoformat()
         return health_status
     
+    async def _get_analytics_status(self) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Ask the analytics workers for each asset's processor status; None when unavailable"""
+        asset_names = list(self._asset_pools)
+        results = await asyncio.gather(*(
+            self._run_analytics(self._asset_pools[asset_name], get_analytics_status, asset_name)
+            for asset_name in asset_names
+        ), return_exceptions=True)
+        
+        analytics_status = {}
+        for asset_name, result in zip(asset_names, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to get analytics status for {asset_name}: {result}")
+                result = None
+            analytics_status[asset_name] = result
+        return analytics_status
+    
     async def _perform_maintenance(self):
         """Perform maintenance tasks"""
         try:
             # Clean up old processed data
             deleted_count = await self.data_buffer.delete_processed_batches(older_than_hours=24)
             if deleted_count > 0:
-                logger.info(f"Cleaned up {deleted_count} old processed batches")
+                logger.info(f"Cleaned up {deleted_count} old processed records")
             
             # Log statistics
             if self.cloud_sender:
@@ -389,22 +632,29 @@ class EdgeCollectorOrchestrator:
             
             self.is_running = True
             
-            # Start all concurrent tasks
-            tasks = [
-                # OPC UA client (runs indefinitely)
-                self.opcua_client.start(),
-                
-                # Buffer sender loop
-                self._buffer_sender_loop(),
-                
-                # Health monitor loop
-                self._health_monitor_loop()
-            ]
-            
             logger.info("Edge Collector started successfully")
             
-            # Wait for all tasks to complete (or shutdown)
-            await asyncio.gather(*tasks, return_exceptions=True)
+            # Run all concurrent tasks; a crash in one cancels its siblings
+            self._tasks_started = True
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    # OPC UA client (runs indefinitely)
+                    self._opcua_task = tg.create_task(self.opcua_client.start())
+                    
+                    # Ingest workers (batched buffer writes), one per queue shard
+                    for ingest_queue in self._ingest_queues:
+                        tg.create_task(self._ingest_consumer_loop(ingest_queue))
+                    
+                    # Buffer sender loop
+                    tg.create_task(self._buffer_sender_loop())
+                    
+                    # Health monitor loop
+                    tg.create_task(self._health_monitor_loop())
+            except* Exception as eg:
+                for exc in eg.exceptions:
+                    logger.error(f"Edge collector task failed: {exc}")
+            finally:
+                self._tasks_done.set()
             
         except KeyboardInterrupt:
             logger.info("Shutdown requested by user")
@@ -414,38 +664,85 @@ class EdgeCollectorOrchestrator:
             await self.stop()
     
     async def stop(self):
-        """Stop the edge collector"""
+        """Stop the edge collector; safe to call more than once"""
+        # Signal handler and start()'s finally both call this; later callers just
+        # wait for the first teardown instead of closing everything twice
+        if self._stop_called:
+            await self._stopped.wait()
+            return
+        self._stop_called = True
+        
         logger.info("Stopping OPC UA Edge Collector...")
         
         self.is_running = False
         self.shutdown_event.set()
+        async with self._flush_cond:
+            self._flush_cond.notify_all()
         
-        # Stop components
-        if self.opcua_client:
-            await self.opcua_client.stop()
+        # The OPC UA client only checks is_running between 30 s health sweeps
+        if self._opcua_task and not self._opcua_task.done():
+            self._opcua_task.cancel()
         
-        if self.cloud_sender:
-            await self.cloud_sender.disconnect()
+        # Let the ingest workers drain the queue and the sender finish its in-flight
+        # batch before closing the buffer and sender they write to
+        if self._tasks_started:
+            await self._tasks_done.wait()
         
+        # Stop components; they are independent, so tear them down in parallel
+        teardown = []
+        if self.opcua_client:
+            teardown.append(self.opcua_client.stop())
+        if self.cloud_sender:
+            teardown.append(self.cloud_sender.disconnect())
         if self.data_buffer:
-            await self.data_buffer.close()
+            teardown.append(self.data_buffer.close())
+        
+        for result in await asyncio.gather(*teardown, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error(f"Error stopping component: {result}")
         
+        # Ingest has drained, so no analytics are outstanding; let the workers exit cleanly
+        await asyncio.gather(*(asyncio.to_thread(pool.shutdown) for pool in self._pool_assets))
+        
+        self._stopped.set()
         logger.info("Edge Collector stopped")
     
-    def setup_signal_handlers(self):
-        """Setup signal handlers for graceful shutdown"""
-        def signal_handler(signum, frame):
-            logger.info(f"Received signal {signum}, initiating shutdown...")
-            asyncio.create_task(self.stop())
-        
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+    def _install_signal_handlers(self):
+        """Setup signal handlers for graceful shutdown on the running event loop"""
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(signum, self._handle_signal, signum)
+            except NotImplementedError:
+                # Not supported by the Windows event loops; Ctrl+C still raises KeyboardInterrupt
+                pass
+    
+    def _handle_signal(self, signum: int):
+        """Schedule shutdown from a signal; runs as a regular loop callback"""
+        logger.info(f"Received signal {signal.Signals(signum).name}, initiating shutdown...")
+        self._stop_task = asyncio.create_task(self.stop())
+
+
+def setup_logging() -> QueueListener:
+    """Configure logging; handlers run on a listener thread so the event loop never blocks on file I/O"""
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [
+        logging.StreamHandler(sys.stdout),
+        RotatingFileHandler('edge_collector.log', maxBytes=50_000_000, backupCount=5)
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
+    
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
 
 
 async def main():
     """Main entry point"""
     orchestrator = EdgeCollectorOrchestrator()
-    orchestrator.setup_signal_handlers()
     
     try:
         await orchestrator.start()
@@ -455,4 +752,16 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop raises the ceiling on OPC UA notifications and HTTP sends per
+    # second; optional, not available on Windows
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
+    log_listener = setup_logging()
+    try:
+        asyncio.run(main())
+    finally:
+        log_listener.stop()
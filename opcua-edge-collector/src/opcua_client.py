@@ -1,25 +1,32 @@
 """Asynchronous OPC UA client with X.509 certificate security"""
 
 import asyncio
+import functools
 import logging
 import os
+import random
+import shutil
+import socket
+import sys
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Callable, Any
-import yaml
-from asyncua import Client, ua
+from collections import defaultdict
+from typing import Dict, List, Optional, Callable, Any, Set, Tuple
+from asyncua import Client, Node, ua
 from asyncua.common.methods import uamethod
+from asyncua.crypto import security_policies, uacrypto
 
-# Add parent directory to path for common models
-import sys
-sys.path.append(str(Path(__file__).parent.parent.parent / "common"))
-
-from data_models import BridgeConfiguration, AssetConfiguration, TelemetryPoint, Quality
+from common.data_models import BridgeConfiguration, AssetConfiguration, TelemetryPoint, Quality
 from config import load_config, get_connection_settings
 
 logger = logging.getLogger(__name__)
 
+# Quality members bound once; enum class attribute lookups are slow on the per-point path
+_QUALITY_GOOD = Quality.GOOD
+_QUALITY_UNCERTAIN = Quality.UNCERTAIN
+_QUALITY_BAD = Quality.BAD
+
 
 class OPCUAClient:
     """Secure OPC UA client with X.509 certificate authentication"""
@@ -27,31 +34,60 @@ class OPCUAClient:
     def __init__(self, config_path: str = "../../use_case_config.yaml"):
         self.config_path = config_path
         self.config: Optional[BridgeConfiguration] = None
-        self.clients: Dict[str, Client] = {}
+        self.clients: Dict[str, Client] = {}  # Keyed by asset; assets on one endpoint share a client
+        self.endpoint_clients: Dict[str, Client] = {}  # Live client per endpoint URL
+        self.assets: Dict[str, AssetConfiguration] = {}
+        self._client_assets: Dict[Client, Set[str]] = {}  # Assets attached to each client
+        self._endpoint_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
         self.subscriptions: Dict[str, Any] = {}
-        self.node_cache: Dict[str, Any] = {}
-        self.data_callbacks: List[Callable[[TelemetryPoint], None]] = []
+        # Per-asset parallel lists of subscribed/read nodes and their tag names
+        self.asset_nodes: Dict[str, List[Node]] = {}
+        self.asset_tags: Dict[str, List[str]] = {}
+        self.asset_meta: Dict[str, Tuple[str, str, str, str, str]] = {}  # enterprise, site, area, line, machine
+        self.namespace_uri = "http://globalcorp.com/opcua/simulation"
+        self.sampling_rates: Dict[str, int] = {}  # Site default sampling rate (ms) per asset
+        self._ns_idx_cache: Dict[str, Optional[int]] = {}  # Namespace index per connected endpoint
+        self._policy_cache: Dict[str, str] = {}  # Security policy discovered per endpoint
+        self.data_callbacks: List[Callable[[List[TelemetryPoint]], None]] = []
+        self.handlers: Dict[str, "DataChangeHandler"] = {}
         self.is_running = False
         
         # Connection management
         self.connection_attempts: Dict[str, int] = {}
         self.last_connection_attempt: Dict[str, float] = {}
+        self.next_retry_at: Dict[str, float] = {}  # time.monotonic() deadline per asset
+        self._disconnected: Dict[str, AssetConfiguration] = {}  # Assets waiting to be reconnected
+        self._reconnect_event = asyncio.Event()
         self.max_retry_attempts = 5
         self.base_retry_delay = 1.0  # Base delay for exponential backoff
         self.max_retry_delay = 60.0  # Maximum delay
+        self._jitter_rng = random.Random()  # Own generator for backoff jitter; seedable in tests
+        
+        # TCP keepalive lets the kernel detect half-open connections (seconds, probe count)
+        self.tcp_keepalive_idle = 30
+        self.tcp_keepalive_interval = 10
+        self.tcp_keepalive_count = 3
         
-        # Security settings
-        self.cert_dir = Path("../../opcua-server-sim/certs")
+        # Security settings (OPCUA_CERT_DIR points at a persistent volume so restarts reuse certificates)
+        self.cert_dir = Path(os.getenv('OPCUA_CERT_DIR', "../../opcua-server-sim/certs"))
         self.client_cert_file = self.cert_dir / "client_cert.der"
         self.client_key_file = self.cert_dir / "client_private_key.pem"
         self.trust_store = self.cert_dir / "trust" / "trust.der"
         
+        # Certificate material is read and parsed once and shared by every asset client
+        self._security_material: Optional[Tuple[Any, ...]] = None
+        self._security_mtimes: Tuple[float, ...] = ()
+        self._security_checked_at = 0.0
+        self.security_cache_ttl = 60.0  # Seconds between certificate file change checks
+        self._cert_lock = asyncio.Lock()  # Concurrent connects must not generate certificates twice
+        
         logger.info("OPC UA Client initialized with enhanced reconnection strategy")
     
     async def load_config(self) -> BridgeConfiguration:
         """Load configuration from YAML file with environment overrides"""
         try:
-            self.config = load_config()
+            # Parse off the event loop so concurrent tasks are not stalled by file I/O
+            self.config = await asyncio.to_thread(load_config)
             logger.info(f"Loaded configuration for enterprise: {self.config.enterprise_name}")
             
             # Update connection settings from config
@@ -74,23 +110,22 @@ class OPCUAClient:
             await self._ensure_client_certificates()
             
             if security_policy == "None":
-                # No security for older PLCs
-                client.set_security_string("None")
+                # No security for older PLCs (asyncua's default policy)
                 logger.info(f"Using no security for endpoint: {endpoint}")
             else:
-                # Setup certificate-based security
-                security_string = f"{security_policy},SignAndEncrypt,{self.client_cert_file},{self.client_key_file}"
-                client.set_security_string(security_string)
-                
-                # Set trust store
-                if self.trust_store.exists():
-                    await client.load_trust_store(str(self.trust_store))
+                # Setup certificate-based security from the cached material
+                cert_bytes, key_bytes, server_cert_bytes, certificate, private_key = await self._get_security_material()
+                await client.set_security(
+                    getattr(security_policies, f"SecurityPolicy{security_policy}"),
+                    uacrypto.CertProperties(cert_bytes, extension="der"),
+                    uacrypto.CertProperties(key_bytes, extension="pem"),
+                    server_certificate=uacrypto.CertProperties(server_cert_bytes, extension="der") if server_cert_bytes else None,
+                    mode=ua.MessageSecurityMode.SignAndEncrypt
+                )
                 
                 # Set user identity (certificate-based)
-                client.set_user_identity_certificate(
-                    str(self.client_cert_file), 
-                    str(self.client_key_file)
-                )
+                client.user_certificate = certificate
+                client.user_private_key = private_key
                 
                 logger.info(f"Using security policy {security_policy} for endpoint: {endpoint}")
             
@@ -100,30 +135,72 @@ class OPCUAClient:
             logger.error(f"Failed to setup security for {endpoint}: {e}")
             raise
     
+    async def _get_security_material(self) -> Tuple[Any, ...]:
+        """Client certificate, key and trusted server certificate, reloaded only when the files change"""
+        now = time.monotonic()
+        if self._security_material is not None and now - self._security_checked_at < self.security_cache_ttl:
+            return self._security_material
+        self._security_checked_at = now
+        
+        # File checks and reads run in a worker thread so concurrent connects keep running
+        known_mtimes = self._security_mtimes if self._security_material is not None else None
+        mtimes, contents = await asyncio.to_thread(self._read_security_files, known_mtimes)
+        if contents is not None:
+            cert_bytes, key_bytes, server_cert_bytes = contents
+            self._security_material = (
+                cert_bytes,
+                key_bytes,
+                server_cert_bytes,
+                await uacrypto.load_certificate(cert_bytes, "der"),
+                await uacrypto.load_private_key(key_bytes, extension="pem")
+            )
+            self._security_mtimes = mtimes
+            logger.info("Loaded client certificate and trust store")
+        
+        return self._security_material
+    
+    def _read_security_files(self, known_mtimes: Optional[Tuple[float, ...]]) -> Tuple[Tuple[float, ...], Optional[Tuple[bytes, bytes, Optional[bytes]]]]:
+        """Certificate file mtimes, plus their contents when they differ from known_mtimes"""
+        files = (self.client_cert_file, self.client_key_file, self.trust_store)
+        mtimes = tuple(f.stat().st_mtime if f.exists() else 0.0 for f in files)
+        if mtimes == known_mtimes:
+            return mtimes, None
+        
+        cert_bytes = self.client_cert_file.read_bytes()
+        key_bytes = self.client_key_file.read_bytes()
+        # An empty trust store means the server certificate is taken from its endpoints
+        server_cert_bytes = (self.trust_store.read_bytes() if self.trust_store.exists() else b"") or None
+        return mtimes, (cert_bytes, key_bytes, server_cert_bytes)
+    
     async def _ensure_client_certificates(self):
         """Generate client certificates if they don't exist"""
-        if not self.client_cert_file.exists() or not self.client_key_file.exists():
-            logger.info("Generating client certificates...")
-            
-            # Import certificate generation utilities
-            from cert_utils import generate_self_signed_certificate
-            
-            cert_file, key_file = generate_self_signed_certificate(
-                cert_dir=str(self.cert_dir),
-                server_name="OPCUA-Edge-Collector-Client"
-            )
-            
-            # Copy to client certificate names
-            import shutil
-            shutil.copy2(cert_file, self.client_cert_file)
-            shutil.copy2(key_file, self.client_key_file)
-            
-            logger.info("Client certificates generated")
+        async with self._cert_lock:
+            if not self.client_cert_file.exists() or not self.client_key_file.exists():
+                logger.info("Generating client certificates...")
+                
+                # Key generation takes seconds of CPU; keep it off the event loop
+                await asyncio.to_thread(self._generate_client_certificates)
+                
+                logger.info("Client certificates generated")
+    
+    def _generate_client_certificates(self):
+        """Create the client certificate and key files in the certificate directory"""
+        # Import certificate generation utilities (only present where the simulator's module is installed)
+        from cert_utils import generate_self_signed_certificate
+        
+        cert_file, key_file = generate_self_signed_certificate(
+            cert_dir=str(self.cert_dir),
+            server_name="OPCUA-Edge-Collector-Client"
+        )
+        
+        # Copy to client certificate names
+        shutil.copy2(cert_file, self.client_cert_file)
+        shutil.copy2(key_file, self.client_key_file)
     
     async def _negotiate_security_policy(self, endpoint: str, asset: Optional[AssetConfiguration] = None) -> str:
         """Negotiate security policy with the server"""
         # Check for explicit policy in configuration
-        if asset and hasattr(asset, 'security_settings'):
+        if asset:
             explicit_policy = asset.security_settings.get('security_policy')
             if explicit_policy:
                 return explicit_policy
@@ -133,13 +210,16 @@ class OPCUAClient:
         if env_policy:
             return env_policy
         
+        # Endpoint discovery costs a full connect; do it once per endpoint, not per attempt
+        if endpoint in self._policy_cache:
+            return self._policy_cache[endpoint]
+        
         # Try to negotiate with server
         try:
             # Create a temporary client to discover endpoints
             temp_client = Client(url=endpoint)
             
-            # Try with no security first to get endpoints
-            temp_client.set_security_string("None")
+            # Connect with no security (the default policy) to get endpoints
             await temp_client.connect()
             
             # Get available endpoints
@@ -147,16 +227,23 @@ class OPCUAClient:
             await temp_client.disconnect()
             
             # Prefer Basic256Sha256 if available, fallback to None
+            policy = "None"
             for endpoint_desc in endpoints:
                 if hasattr(endpoint_desc, 'SecurityPolicyUri'):
                     if 'Basic256Sha256' in endpoint_desc.SecurityPolicyUri:
-                        return 'Basic256Sha256'
+                        policy = 'Basic256Sha256'
+                        break
                     elif 'Basic128Rsa15' in endpoint_desc.SecurityPolicyUri:
-                        return 'Basic128Rsa15'
+                        policy = 'Basic128Rsa15'
+                        break
             
-            # Fallback to no security
-            logger.warning(f"No compatible security policy found for {endpoint}, using None")
-            return "None"
+            if policy == "None":
+                # Fallback to no security
+                logger.warning(f"No compatible security policy found for {endpoint}, using None")
+            
+            # Only a successful discovery is cached; a failed one is retried on the next attempt
+            self._policy_cache[endpoint] = policy
+            return policy
             
         except Exception as e:
             logger.warning(f"Failed to negotiate security policy for {endpoint}: {e}, using None")
@@ -168,8 +255,7 @@ class OPCUAClient:
         delay = min(self.base_retry_delay * (2 ** attempt), self.max_retry_delay)
         
         # Add jitter to prevent thundering herd
-        import random
-        jitter = random.uniform(0.1, 0.3) * delay
+        jitter = (0.1 + 0.2 * self._jitter_rng.random()) * delay
         
         return delay + jitter
     
@@ -180,11 +266,8 @@ class OPCUAClient:
         if attempt >= self.max_retry_attempts:
             return False
         
-        # Check if enough time has passed since last attempt
-        last_attempt = self.last_connection_attempt.get(asset_name, 0)
-        retry_delay = self._calculate_retry_delay(asset_name)
-        
-        return (time.time() - last_attempt) >= retry_delay
+        # Check if the backoff delay set by the last failed attempt has passed
+        return time.monotonic() >= self.next_retry_at.get(asset_name, 0.0)
     
     async def connect_to_asset(self, asset: AssetConfiguration) -> bool:
         """Connect to a single asset's OPC UA server with exponential backoff"""
@@ -195,55 +278,188 @@ class OPCUAClient:
             logger.warning(f"Max retry attempts reached for {asset_name}, giving up")
             return False
         
-        try:
-            endpoint = asset.opcua_endpoint
-            logger.info(f"Connecting to asset: {asset_name} at {endpoint} (attempt {self.connection_attempts.get(asset_name, 0) + 1})")
-            
-            # Update connection attempt tracking
-            self.connection_attempts[asset_name] = self.connection_attempts.get(asset_name, 0) + 1
-            self.last_connection_attempt[asset_name] = time.time()
-            
-            # Create client
-            client = Client(url=endpoint)
-            
-            # Setup security with dynamic negotiation
-            client = await self.setup_security(client, endpoint, asset)
-            
-            # Set connection timeout
-            conn_settings = get_connection_settings()
-            timeout = conn_settings.get('connection_timeout', 10.0)
-            client.set_timeout(timeout)
-            
-            # Connect
-            await client.connect()
-            
-            # Store client and reset connection attempts on success
-            self.clients[asset_name] = client
-            self.connection_attempts[asset_name] = 0
-            
-            logger.info(f"Successfully connected to {asset_name}")
-            return True
+        endpoint = asset.opcua_endpoint
+        async with self._endpoint_locks[endpoint]:
+            # Assets on the same server share one client (one SecureChannel and session)
+            client = self.endpoint_clients.get(endpoint)
+            if client is not None:
+                self._attach_asset(asset, client)
+                logger.info(f"Reusing connection to {endpoint} for {asset_name}")
+                return True
             
+            try:
+                logger.info(f"Connecting to asset: {asset_name} at {endpoint} (attempt {self.connection_attempts.get(asset_name, 0) + 1})")
+                
+                # Update connection attempt tracking
+                self.connection_attempts[asset_name] = self.connection_attempts.get(asset_name, 0) + 1
+                self.last_connection_attempt[asset_name] = time.monotonic()
+                
+                # Create client with the configured request timeout (asyncua takes it at construction)
+                conn_settings = get_connection_settings()
+                timeout = conn_settings.get('connection_timeout', 10.0)
+                client = Client(url=endpoint, timeout=timeout)
+                
+                # Setup security with dynamic negotiation
+                client = await self.setup_security(client, endpoint, asset)
+                
+                # Connect
+                await client.connect()
+                self._enable_tcp_keepalive(client, endpoint)
+                
+                # Resolve the namespace index once per connection instead of per tag
+                try:
+                    self._ns_idx_cache[endpoint] = await client.get_namespace_index(self.namespace_uri)
+                except ValueError:
+                    logger.warning(f"Namespace {self.namespace_uri} not found on {endpoint}")
+                    self._ns_idx_cache[endpoint] = None
+                
+                # asyncua's watchdog reports a dead connection; reconnect on that instead of polling
+                client.connection_lost_callback = functools.partial(self._on_connection_lost, endpoint, client)
+                
+                # Store client and reset connection attempts on success
+                self.endpoint_clients[endpoint] = client
+                self._attach_asset(asset, client)
+                
+                logger.info(f"Successfully connected to {asset_name}")
+                return True
+                
+            except Exception as e:
+                logger.error(f"Failed to connect to {asset_name}: {e}")
+                
+                # The server may have changed its security configuration; rediscover next time
+                self._policy_cache.pop(endpoint, None)
+                
+                # Calculate next retry delay
+                retry_delay = self._calculate_retry_delay(asset_name)
+                self.next_retry_at[asset_name] = time.monotonic() + retry_delay
+                logger.info(f"Next retry for {asset_name} in {retry_delay:.1f} seconds")
+                
+                return False
+    
+    def _enable_tcp_keepalive(self, client: Client, endpoint: str):
+        """Turn on TCP keepalive for a connected client's socket"""
+        try:
+            sock = client.uaclient.protocol.transport.get_extra_info("socket")
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            
+            # Probe timing options are platform specific (Linux names; macOS only has TCP_KEEPALIVE)
+            for option, value in (("TCP_KEEPIDLE", self.tcp_keepalive_idle),
+                                  ("TCP_KEEPINTVL", self.tcp_keepalive_interval),
+                                  ("TCP_KEEPCNT", self.tcp_keepalive_count)):
+                if hasattr(socket, option):
+                    sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
         except Exception as e:
-            logger.error(f"Failed to connect to {asset_name}: {e}")
-            
-            # Calculate next retry delay
-            retry_delay = self._calculate_retry_delay(asset_name)
-            logger.info(f"Next retry for {asset_name} in {retry_delay:.1f} seconds")
+            # Keepalive is an optimization; asyncua's watchdog still detects dead connections
+            logger.warning(f"Could not enable TCP keepalive for {endpoint}: {e}")
+    
+    def _attach_asset(self, asset: AssetConfiguration, client: Client):
+        """Record that an asset uses a connected client"""
+        self.assets[asset.asset_name] = asset
+        self.clients[asset.asset_name] = client
+        self._client_assets.setdefault(client, set()).add(asset.asset_name)
+        self.connection_attempts[asset.asset_name] = 0
+    
+    async def _on_connection_lost(self, endpoint: str, client: Client, exc: Exception):
+        """Queue every asset on a lost connection for reconnection"""
+        logger.warning(f"Connection to {endpoint} lost: {exc}")
+        
+        # New connects must not reuse the dead client
+        if self.endpoint_clients.get(endpoint) is client:
+            del self.endpoint_clients[endpoint]
+        
+        for asset_name in list(self._client_assets.get(client, ())):
+            self._schedule_reconnect(self.assets[asset_name])
+    
+    def _schedule_reconnect(self, asset: AssetConfiguration):
+        """Mark an asset as disconnected and wake the reconnection loop"""
+        self._disconnected[asset.asset_name] = asset
+        self._reconnect_event.set()
+    
+    async def _reconnect_loop(self):
+        """Reconnect lost assets, sleeping until a connection is lost or the next backoff expires"""
+        while self.is_running:
+            self._reconnect_event.clear()
+            timeout = None
+            
+            if self._disconnected:
+                now = time.monotonic()
+                due = [asset for asset_name, asset in self._disconnected.items()
+                       if self.next_retry_at.get(asset_name, 0.0) <= now]
+                
+                for asset in due:
+                    del self._disconnected[asset.asset_name]
+                    # Drop the dead client before replacing it
+                    if asset.asset_name in self.clients:
+                        await self.disconnect_from_asset(asset.asset_name)
+                
+                if due:
+                    logger.info(f"Attempting to reconnect to {len(due)} assets")
+                    reconnected = {asset.asset_name for asset in await self._connect_and_subscribe(due)}
+                    
+                    for asset in due:
+                        if asset.asset_name in reconnected:
+                            continue
+                        if self.connection_attempts.get(asset.asset_name, 0) >= self.max_retry_attempts:
+                            logger.warning(f"Max retry attempts reached for {asset.asset_name}, giving up")
+                        else:
+                            self._disconnected[asset.asset_name] = asset
+                
+                if self._disconnected:
+                    next_retry = min(self.next_retry_at.get(asset_name, 0.0) for asset_name in self._disconnected)
+                    timeout = max(0.0, next_retry - time.monotonic())
             
-            return False
+            try:
+                await asyncio.wait_for(self._reconnect_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
     
     async def disconnect_from_asset(self, asset_name: str):
         """Disconnect from a specific asset"""
         try:
-            if asset_name in self.clients:
-                client = self.clients[asset_name]
-                await client.disconnect()
-                del self.clients[asset_name]
-                logger.info(f"Disconnected from {asset_name}")
+            # Forget the client before awaiting so a dead or concurrent disconnect cannot leave it behind
+            client = self.clients.pop(asset_name, None)
+            if client is None:
+                return
+            
+            # Cached nodes are bound to the old connection
+            self.asset_nodes.pop(asset_name, None)
+            self.asset_tags.pop(asset_name, None)
+            self.handlers.pop(asset_name, None)
+            subscription = self.subscriptions.pop(asset_name, None)
+            endpoint = self.assets[asset_name].opcua_endpoint
+            live = self.endpoint_clients.get(endpoint) is client
+            
+            users = self._client_assets.get(client, set())
+            users.discard(asset_name)
+            if users:
+                # Other assets still share this connection; only drop this asset's subscription
+                if subscription is not None and live and self.is_running:
+                    await subscription.delete()
+                logger.info(f"Detached {asset_name} from shared connection {endpoint}")
+                return
+            
+            self._client_assets.pop(client, None)
+            if live:
+                del self.endpoint_clients[endpoint]
+            await client.disconnect()
+            logger.info(f"Disconnected from {asset_name}")
         except Exception as e:
             logger.error(f"Error disconnecting from {asset_name}: {e}")
     
+    def _resolve_node_id(self, asset: AssetConfiguration, node_id: str) -> ua.NodeId:
+        """Build the NodeId for a configured node ID without any server round-trip"""
+        # Full namespace format like "ns=2;i=1001"
+        if node_id.startswith("ns="):
+            return ua.NodeId.from_string(node_id)
+        
+        # Simple format, add the namespace resolved at connect time
+        ns_idx = self._ns_idx_cache.get(asset.opcua_endpoint)
+        if ns_idx is None:
+            raise ValueError(f"No namespace index for {asset.asset_name}")
+        if node_id.isdigit():
+            return ua.NodeId(int(node_id), ns_idx)
+        return ua.NodeId(node_id, ns_idx)
+    
     async def subscribe_to_asset(self, asset: AssetConfiguration) -> bool:
         """Subscribe to all configured tags for an asset"""
         try:
@@ -253,49 +469,59 @@ class OPCUAClient:
             
             client = self.clients[asset.asset_name]
             
-            # Get namespace index
-            uri = "http://globalcorp.com/opcua/simulation"
-            ns_idx = await client.get_namespace_index(uri)
-            
-            # Create subscription
-            handler = DataChangeHandler(asset, self.data_callbacks)
-            subscription = await client.create_subscription(1000, handler)  # 1 second publishing interval
-            
-            # Subscribe to all configured nodes
-            subscribed_nodes = 0
+            # Resolve all configured nodes first so they can be subscribed in one request
+            tag_names = []
+            nodes = []
             
             for tag_name, node_id in asset.node_mapping.items():
                 try:
-                    # Parse node ID (handle both string and numeric formats)
-                    if node_id.startswith("ns="):
-                        # Full namespace format like "ns=2;i=1001"
-                        node = await client.get_node(node_id)
-                    else:
-                        # Simple format, add namespace
-                        if node_id.isdigit():
-                            node_id_full = f"ns={ns_idx};i={node_id}"
-                        else:
-                            node_id_full = f"ns={ns_idx};s={node_id}"
-                        node = await client.get_node(node_id_full)
-                    
-                    # Subscribe to data changes
-                    await subscription.subscribe_data_change(node)
-                    
-                    # Cache node reference
-                    cache_key = f"{asset.asset_name}.{tag_name}"
-                    self.node_cache[cache_key] = node
-                    
-                    subscribed_nodes += 1
-                    logger.debug(f"Subscribed to {asset.asset_name}.{tag_name}")
-                    
+                    nodes.append(Node(client.uaclient, self._resolve_node_id(asset, node_id)))
+                    # Interned: every point of this tag, across assets, shares one string
+                    tag_names.append(sys.intern(tag_name))
                 except Exception as e:
-                    logger.error(f"Failed to subscribe to {asset.asset_name}.{tag_name}: {e}")
+                    logger.error(f"Failed to resolve {asset.asset_name}.{tag_name}: {e}")
+            
+            # Create subscription; the handler maps notified NodeIds back to tags by equality
+            node_to_tag = {node.nodeid: tag_name for tag_name, node in zip(tag_names, nodes)}
+            handler = DataChangeHandler(asset, tuple(self.data_callbacks), node_to_tag, self.config.enterprise_name)
+            self.handlers[asset.asset_name] = handler
+            subscription = await client.create_subscription(1000, handler)  # 1 second publishing interval
+            
+            # Group tags by sampling interval (metadata 'sampling_rates' overrides the site default)
+            # so each interval goes to the server as one CreateMonitoredItems request
+            tag_rates = asset.metadata.get('sampling_rates', {})
+            default_rate = self.sampling_rates.get(asset.asset_name, 0)
+            groups: Dict[float, List[int]] = defaultdict(list)
+            for index, tag_name in enumerate(tag_names):
+                groups[float(tag_rates.get(tag_name, default_rate))].append(index)
+            
+            results: List[Any] = [None] * len(nodes)
+            for interval in sorted(groups):
+                indexes = groups[interval]
+                group_results = await subscription.subscribe_data_change(
+                    [nodes[index] for index in indexes], sampling_interval=interval
+                )
+                for index, result in zip(indexes, group_results):
+                    results[index] = result
+            subscribed_tags = []
+            subscribed_nodes = []
+            
+            for tag_name, node, result in zip(tag_names, nodes, results):
+                if isinstance(result, ua.StatusCode):
+                    logger.error(f"Failed to subscribe to {asset.asset_name}.{tag_name}: {result.name}")
+                    continue
+                subscribed_tags.append(tag_name)
+                subscribed_nodes.append(node)
+            
+            # Cache node references
+            self.asset_tags[asset.asset_name] = subscribed_tags
+            self.asset_nodes[asset.asset_name] = subscribed_nodes
             
             # Store subscription
             self.subscriptions[asset.asset_name] = subscription
             
-            logger.info(f"Subscribed to {subscribed_nodes} tags for {asset.asset_name}")
-            return subscribed_nodes > 0
+            logger.info(f"Subscribed to {len(subscribed_nodes)} tags for {asset.asset_name}")
+            return len(subscribed_nodes) > 0
             
         except Exception as e:
             logger.error(f"Failed to subscribe to {asset.asset_name}: {e}")
@@ -311,48 +537,63 @@ class OPCUAClient:
                 return telemetry_points
             
             client = self.clients[asset.asset_name]
+            asset_name = asset.asset_name
             
-            for tag_name, node_id in asset.node_mapping.items():
-                try:
-                    cache_key = f"{asset.asset_name}.{tag_name}"
-                    if cache_key in self.node_cache:
-                        node = self.node_cache[cache_key]
-                    else:
-                        # Get node if not cached
-                        if node_id.startswith("ns="):
-                            node = await client.get_node(node_id)
-                        else:
-                            ns_idx = await client.get_namespace_index("http://globalcorp.com/opcua/simulation")
-                            if node_id.isdigit():
-                                node_id_full = f"ns={ns_idx};i={node_id}"
-                            else:
-                                node_id_full = f"ns={ns_idx};s={node_id}"
-                            node = await client.get_node(node_id_full)
-                        
-                        self.node_cache[cache_key] = node
-                    
-                    # Read value
-                    data_value = await node.read_data_value()
-                    value = data_value.Value.Value
-                    
-                    # Create telemetry point
-                    telemetry_point = TelemetryPoint(
-                        timestamp=datetime.utcnow(),
-                        enterprise=self.config.enterprise_name,
-                        site=asset.metadata.get('site', 'Unknown'),
-                        area=asset.metadata.get('area', 'Unknown'),
-                        line=asset.metadata.get('line', 'Unknown'),
-                        machine=asset.asset_name,
-                        tag=tag_name,
-                        value=value,
-                        unit=None,  # Could be enhanced to read from node properties
-                        quality=Quality.GOOD  # Could be enhanced to read actual quality
-                    )
-                    
-                    telemetry_points.append(telemetry_point)
-                    
-                except Exception as e:
-                    logger.error(f"Failed to read {asset.asset_name}.{tag_name}: {e}")
+            # Resolve all nodes once so they can be read in one request
+            if asset_name not in self.asset_nodes:
+                tag_names = []
+                nodes = []
+                for tag_name, node_id in asset.node_mapping.items():
+                    try:
+                        nodes.append(Node(client.uaclient, self._resolve_node_id(asset, node_id)))
+                        tag_names.append(sys.intern(tag_name))
+                    except Exception as e:
+                        logger.error(f"Failed to resolve {asset_name}.{tag_name}: {e}")
+                self.asset_tags[asset_name] = tag_names
+                self.asset_nodes[asset_name] = nodes
+            
+            nodes = self.asset_nodes[asset_name]
+            if not nodes:
+                return telemetry_points
+            
+            if asset_name not in self.asset_meta:
+                self.asset_meta[asset_name] = (
+                    sys.intern(self.config.enterprise_name),
+                    sys.intern(asset.metadata.get('site', 'Unknown')),
+                    sys.intern(asset.metadata.get('area', 'Unknown')),
+                    sys.intern(asset.metadata.get('line', 'Unknown')),
+                    sys.intern(asset_name)
+                )
+            enterprise, site, area, line, machine = self.asset_meta[asset_name]
+            
+            # Single Read service call for every node instead of one round-trip per tag
+            data_values = await client.read_attributes(nodes)
+            read_time = datetime.now(timezone.utc)
+            
+            for tag_name, data_value in zip(self.asset_tags[asset_name], data_values):
+                status = data_value.StatusCode
+                if status is None or status.is_good():
+                    quality = _QUALITY_GOOD
+                elif status.is_uncertain():
+                    quality = _QUALITY_UNCERTAIN
+                else:
+                    quality = _QUALITY_BAD
+                
+                # Create telemetry point
+                telemetry_point = TelemetryPoint(
+                    timestamp=data_value.SourceTimestamp or data_value.ServerTimestamp or read_time,
+                    enterprise=enterprise,
+                    site=site,
+                    area=area,
+                    line=line,
+                    machine=machine,
+                    tag=tag_name,
+                    value=data_value.Value.Value if data_value.Value else None,
+                    unit=None,  # Could be enhanced to read from node properties
+                    quality=quality
+                )
+                
+                telemetry_points.append(telemetry_point)
             
             return telemetry_points
             
@@ -360,9 +601,28 @@ class OPCUAClient:
             logger.error(f"Failed to read nodes for {asset.asset_name}: {e}")
             return telemetry_points
     
-    def add_data_callback(self, callback: Callable[[TelemetryPoint], None]):
-        """Add callback function for received data"""
+    def add_data_callback(self, callback: Callable[[List[TelemetryPoint]], None]):
+        """Add callback function for received data; it is called with a list of points"""
         self.data_callbacks.append(callback)
+        
+        # Handlers dispatch from an immutable snapshot; refresh it on the rare registration
+        callbacks = tuple(self.data_callbacks)
+        for handler in self.handlers.values():
+            handler.callbacks = callbacks
+    
+    async def _connect_and_subscribe(self, assets: List[AssetConfiguration]) -> List[AssetConfiguration]:
+        """Connect to and subscribe to the given assets concurrently, returning the subscribed ones"""
+        # gather rather than a TaskGroup: one asset failing must not cancel the others
+        results = await asyncio.gather(
+            *(self._connect_and_subscribe_asset(asset) for asset in assets), return_exceptions=True
+        )
+        return [asset for asset, result in zip(assets, results) if result is True]
+    
+    async def _connect_and_subscribe_asset(self, asset: AssetConfiguration) -> bool:
+        """Subscribe to an asset as soon as its own connection is up, without waiting for the others"""
+        if not await self.connect_to_asset(asset):
+            return False
+        return await self.subscribe_to_asset(asset)
     
     async def start(self):
         """Start the OPC UA client and connect to all assets"""
@@ -374,49 +634,27 @@ class OPCUAClient:
                 raise ValueError("Configuration not loaded")
             
             self.is_running = True
-            connected_assets = []
-            
-            # Connect to all assets
-            for site in self.config.sites:
-                for asset in site.assets:
-                    if await self.connect_to_asset(asset):
-                        connected_assets.append(asset)
+            assets = [asset for site in self.config.sites for asset in site.assets]
+            self.sampling_rates = {
+                asset.asset_name: site.default_sampling_rate
+                for site in self.config.sites for asset in site.assets
+            }
             
-            # Subscribe to all connected assets
-            subscribed_assets = []
-            for asset in connected_assets:
-                if await self.subscribe_to_asset(asset):
-                    subscribed_assets.append(asset)
+            # Connect and subscribe to all assets concurrently; the handshakes are I/O bound
+            subscribed_assets = await self._connect_and_subscribe(assets)
             
             logger.info(f"OPC UA Client started: {len(subscribed_assets)} assets connected and subscribed")
             
+            # Anything that did not come up is retried by the reconnection loop
+            subscribed_names = {asset.asset_name for asset in subscribed_assets}
+            for asset in assets:
+                if asset.asset_name not in subscribed_names:
+                    self._schedule_reconnect(asset)
+            
             # Keep running with enhanced reconnection logic
             try:
-                while self.is_running:
-                    await asyncio.sleep(30)  # Check every 30 seconds
-                    
-                    # Reconnection logic with exponential backoff
-                    for site in self.config.sites:
-                        for asset in site.assets:
-                            asset_name = asset.asset_name
-                            
-                            # Check if asset is disconnected
-                            if asset_name not in self.clients:
-                                # Check if we should retry
-                                if await self._should_retry_connection(asset_name):
-                                    logger.info(f"Attempting to reconnect to {asset_name}")
-                                    if await self.connect_to_asset(asset):
-                                        await self.subscribe_to_asset(asset)
-                            else:
-                                # Check if existing connection is still alive
-                                try:
-                                    client = self.clients[asset_name]
-                                    # Simple health check - try to get namespace array
-                                    await client.get_namespace_array()
-                                except Exception as e:
-                                    logger.warning(f"Connection to {asset_name} appears dead: {e}")
-                                    await self.disconnect_from_asset(asset_name)
-                    
+                await self._reconnect_loop()
+                
             except asyncio.CancelledError:
                 logger.info("OPC UA Client shutdown requested")
                 
@@ -430,10 +668,12 @@ class OPCUAClient:
         """Stop the OPC UA client and disconnect from all assets"""
         logger.info("Stopping OPC UA Client...")
         self.is_running = False
+        self._reconnect_event.set()
         
         # Disconnect from all assets
         for asset_name in list(self.clients.keys()):
             await self.disconnect_from_asset(asset_name)
+        self._policy_cache.clear()
         
         logger.info("OPC UA Client stopped")
 
@@ -441,55 +681,71 @@ class OPCUAClient:
 class DataChangeHandler:
     """Handler for OPC UA data change notifications"""
     
-    def __init__(self, asset: AssetConfiguration, callbacks: List[Callable[[TelemetryPoint], None]]):
+    # Fixed attribute layout: cheaper attribute access on the per-notification path
+    __slots__ = ('asset', 'callbacks', 'logger', '_make_point', 'node_to_tag', '_pending', '_loop')
+    
+    def __init__(self, asset: AssetConfiguration, callbacks: Tuple[Callable[[List[TelemetryPoint]], None], ...],
+                 node_to_tag: Dict[ua.NodeId, str], enterprise: str):
         self.asset = asset
         self.callbacks = callbacks
         self.logger = logging.getLogger(f"{__name__}.{asset.asset_name}")
+        
+        # ISA-95 fields are constant per asset, so bind them (interned, shared with every other
+        # asset on the same site/area/line) once into a point factory
+        self._make_point = functools.partial(
+            TelemetryPoint,
+            enterprise=sys.intern(enterprise),
+            site=sys.intern(asset.metadata.get('site', 'Unknown')),
+            area=sys.intern(asset.metadata.get('area', 'Unknown')),
+            line=sys.intern(asset.metadata.get('line', 'Unknown')),
+            machine=sys.intern(asset.asset_name),
+            unit=None,
+            quality=_QUALITY_GOOD
+        )
+        
+        # Reverse mapping from subscribed NodeId to tag name
+        self.node_to_tag = node_to_tag
+        
+        # Points collected from one publish response, delivered together once it is processed
+        self._pending: List[TelemetryPoint] = []
+        self._loop = asyncio.get_running_loop()
     
-    def datachange_notification(self, event: ua.DataChangeNotification):
-        """Handle data change notifications"""
+    def datachange_notification(self, node, val, data):
+        """Handle a data change notification for one monitored item"""
         try:
-            for item in event.monitored_items:
-                node_id = item.ClientHandle
-                value = item.Value.Value
-                
-                # Find tag name by reverse lookup (simplified approach)
-                tag_name = self._find_tag_name(node_id)
-                if not tag_name:
-                    self.logger.warning(f"Unknown node ID: {node_id}")
-                    continue
-                
-                # Create telemetry point
-                telemetry_point = TelemetryPoint(
-                    timestamp=datetime.utcnow(),
-                    enterprise="GlobalCorp",  # Should be from config
-                    site=self.asset.metadata.get('site', 'Unknown'),
-                    area=self.asset.metadata.get('area', 'Unknown'),
-                    line=self.asset.metadata.get('line', 'Unknown'),
-                    machine=self.asset.asset_name,
-                    tag=tag_name,
-                    value=value,
-                    unit=None,
-                    quality=Quality.GOOD
-                )
-                
-                # Call all callbacks
-                for callback in self.callbacks:
-                    try:
-                        callback(telemetry_point)
-                    except Exception as e:
-                        self.logger.error(f"Error in data callback: {e}")
-                
-                self.logger.debug(f"Received data: {tag_name} = {value}")
-                
+            tag_name = self.node_to_tag.get(node.nodeid)
+            if not tag_name:
+                self.logger.warning(f"Unknown node ID: {node.nodeid}")
+                return
+            
+            # Use the timestamps the stack already decoded (timezone-aware UTC) rather than
+            # reading the clock for every notification; servers may omit the source timestamp
+            data_value = data.monitored_item.Value
+            timestamp = data_value.SourceTimestamp or data_value.ServerTimestamp or datetime.now(timezone.utc)
+            
+            # Create telemetry point; only the per-notification fields are passed
+            pending = self._pending
+            pending.append(self._make_point(timestamp=timestamp, tag=tag_name, value=val))
+            
+            # asyncua calls this for every item of a publish response in one synchronous
+            # pass; deliver the whole batch right after it instead of point by point
+            if len(pending) == 1:
+                self._loop.call_soon(self._deliver)
+            
+            # Skip building the message entirely unless debug logging is on (isEnabledFor is cached)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"Received data: {tag_name} = {val}")
+            
         except Exception as e:
             self.logger.error(f"Error in data change notification: {e}")
     
-    def _find_tag_name(self, node_id) -> Optional[str]:
-        """Find tag name by node ID (simplified implementation)"""
-        # In a real implementation, this would maintain a reverse mapping
-        # For now, we'll use a simple approach
-        for tag_name, tag_node_id in self.asset.node_mapping.items():
-            if str(node_id) in str(tag_node_id):
-                return tag_name
-        return None
+    def _deliver(self):
+        """Hand the collected points to every callback as one list"""
+        points = self._pending
+        self._pending = []
+        
+        for callback in self.callbacks:
+            try:
+                callback(points)
+            except Exception as e:
+                self.logger.error(f"Error in data callback: {e}")
@@ -1,6 +1,7 @@
 """Certificate utilities for OPC UA server security"""
 
 import os
+import ipaddress
 import logging
 from pathlib import Path
 from cryptography import x509
@@ -30,7 +31,9 @@ def generate_self_signed_certificate(cert_dir: str = "certs",
     cert_file = cert_path / "server_cert.der"
     key_file = cert_path / "server_private_key.pem"
     
-    if cert_file.exists() and key_file.exists():
+    # Fast path is a stat() per file; empty files (e.g. from an interrupted run) are regenerated
+    if (cert_file.exists() and cert_file.stat().st_size > 0
+            and key_file.exists() and key_file.stat().st_size > 0):
         logger.info("Certificates already exist, skipping generation")
         return str(cert_file), str(key_file)
     
@@ -42,7 +45,8 @@ def generate_self_signed_certificate(cert_dir: str = "certs",
         key_size=2048,
     )
     
-    # Create certificate
+    # Create certificate; one timezone-aware timestamp bounds the validity period
+    now = datetime.datetime.now(datetime.timezone.utc)
     subject = issuer = x509.Name([
         x509.NameAttribute(NameOID.COUNTRY_NAME, "US"),
         x509.NameAttribute(NameOID.STATE_OR_PROVINCE_NAME, "California"),
@@ -60,30 +64,28 @@ def generate_self_signed_certificate(cert_dir: str = "certs",
     ).serial_number(
         x509.random_serial_number()
     ).not_valid_before(
-        datetime.datetime.utcnow()
+        now
     ).not_valid_after(
-        datetime.datetime.utcnow() + datetime.timedelta(days=365)
+        now + datetime.timedelta(days=365)
     ).add_extension(
         x509.SubjectAlternativeName([
             x509.DNSName(server_name),
             x509.DNSName("localhost"),
-            x509.IPAddress("127.0.0.1"),
-            x509.IPAddress("0.0.0.0"),
+            x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
+            x509.IPAddress(ipaddress.ip_address("0.0.0.0")),
         ]),
         critical=False,
     ).sign(private_key, hashes.SHA256())
     
     # Write certificate to file
-    with open(cert_file, "wb") as f:
-        f.write(cert.public_bytes(serialization.Encoding.DER))
+    _write_file(cert_file, cert.public_bytes(serialization.Encoding.DER), 0o644)
     
-    # Write private key to file
-    with open(key_file, "wb") as f:
-        f.write(private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.PKCS8,
-            encryption_algorithm=serialization.NoEncryption()
-        ))
+    # Write private key to file, readable by the owner only
+    _write_file(key_file, private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    ), 0o600)
     
     logger.info(f"Certificate generated: {cert_file}")
     logger.info(f"Private key generated: {key_file}")
@@ -91,6 +93,15 @@ def generate_self_signed_certificate(cert_dir: str = "certs",
     return str(cert_file), str(key_file)
 
 
+def _write_file(path: Path, data: bytes, mode: int):
+    """Write a file in one unbuffered write, created with the given permissions"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
 def create_trust_store(cert_dir: str = "certs") -> str:
     """
     Create trust store directory for client certificates
@@ -1,22 +1,62 @@
 """Security-hardened OPC UA Simulation Server"""
 
 import asyncio
+import bisect
 import logging
 import random
+import re
+import signal
 import time
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional, Tuple
 import yaml
 from asyncua import Server, ua
 from asyncua.common.methods import uamethod
 
+from common.data_models import BridgeConfiguration, AssetConfiguration
 from cert_utils import generate_self_signed_certificate, create_trust_store
 
-# Add parent directory to path for common models
-import sys
-sys.path.append(str(Path(__file__).parent.parent.parent / "common"))
+# libyaml-backed loader when available; the pure-Python parser is much slower on large configs
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 
-from data_models import BridgeConfiguration
+# Python type each simulated variable's value is coerced to before writing
+_VARIANT_CASTS = {
+    ua.VariantType.Double: float,
+    ua.VariantType.UInt32: int,
+    ua.VariantType.String: str,
+}
+
+# Tag name keywords (case-insensitive) that decide a variable's type; checked in this order, Double otherwise
+_DOUBLE_TAG_RE = re.compile(r'voltage|current|power|energy|frequency|efficiency|irradiance|soc|thd', re.IGNORECASE)
+_UINT32_TAG_RE = re.compile(r'count|cycle', re.IGNORECASE)
+_STRING_TAG_RE = re.compile(r'state|status', re.IGNORECASE)
+
+# Equipment states and their cumulative probabilities (85% / 10% / 3% / 2%)
+_EQUIPMENT_STATES = ("Running", "Standby", "Fault", "Maintenance")
+_EQUIPMENT_STATE_CUM_WEIGHTS = (0.85, 0.95, 0.98)  # Upper bounds; anything above is the last state
+
+# Smallest change worth publishing for slowly varying tags; other tags are written whenever their value changes
+_MIN_DELTAS = {'SoC': 0.01, 'Health_Index': 0.01, 'Temperature': 0.1}
+
+# Power tag(s) each cumulative energy tag integrates, in order of preference
+_ENERGY_SOURCE_TAGS = {
+    'Energy_Total': ('Power_Active', 'Power_Total'),  # Solar inverter, load panel
+    'Energy_Import_Total': ('Power_Import',),
+    'Energy_Export_Total': ('Power_Export',),
+    'Energy_Charged': ('Power_Charge',),
+    'Energy_Discharged': ('Power_Discharge',),
+}
+
+_PHASE_VOLTAGE = 400.0 / 1.732  # Phase voltage for 400V 3-phase
+
+# The generators run for every variable every tick; bind the random functions once
+_uniform = random.uniform
+_randint = random.randint
+_random = random.random
 
 
 class OPCUASimulationServer:
@@ -28,6 +68,7 @@ class OPCUASimulationServer:
         self.config = None
         self.node_variables: Dict[str, Any] = {}
         self.simulation_tasks: List[asyncio.Task] = []
+        self._stop_event = asyncio.Event()  # Set by SIGINT/SIGTERM to shut down
         
         # Setup logging
         logging.basicConfig(
@@ -39,31 +80,34 @@ class OPCUASimulationServer:
     async def load_config(self) -> BridgeConfiguration:
         """Load configuration from YAML file"""
         try:
-            config_file = Path(__file__).parent / self.config_path
-            with open(config_file, 'r') as f:
-                config_data = yaml.safe_load(f)
-            self.config = BridgeConfiguration(**config_data)
+            # File read, YAML parse and model validation are blocking; keep them off the event loop
+            self.config = await asyncio.to_thread(self._read_config)
             self.logger.info(f"Loaded configuration for enterprise: {self.config.enterprise_name}")
             return self.config
         except Exception as e:
             self.logger.error(f"Failed to load configuration: {e}")
             raise
     
+    def _read_config(self) -> BridgeConfiguration:
+        """Read and validate the configuration file"""
+        config_file = Path(__file__).parent / self.config_path
+        with open(config_file, 'rb') as f:
+            config_data = yaml.load(f, Loader=_YamlLoader)
+        return BridgeConfiguration(**config_data)
+    
     async def setup_security(self) -> Server:
         """Setup OPC UA server with X.509 certificate security"""
         self.logger.info("Setting up OPC UA server with security...")
         
-        # Generate certificates
-        cert_file, key_file = generate_self_signed_certificate(
-            cert_dir="../../opcua-server-sim/certs",
-            server_name="OPCUA-Simulation-Server"
-        )
+        # Generate certificates and read them once, off the event loop (RSA key generation takes seconds of CPU)
+        cert_data, key_data = await asyncio.to_thread(self._read_server_credentials)
         
         # Create trust store
         trust_store = create_trust_store("../../opcua-server-sim/certs")
         
         # Setup server
         server = Server()
+        await server.init()
         server.set_server_name("OPCUA Simulation Server")
         server.set_endpoint("opc.tcp://0.0.0.0:4840/")
         
@@ -73,16 +117,24 @@ class OPCUASimulationServer:
             ua.SecurityPolicyType.Basic256Sha256_Sign,
         ])
         
-        # Load certificate and private key
-        await server.load_certificate(cert_file)
-        await server.load_private_key(key_file)
+        # Load certificate (DER) and private key (PEM) from memory
+        await server.load_certificate(cert_data)
+        await server.load_private_key(key_data, format="pem")
         
-        # Setup user identity tokens (X.509 certificates)
-        server.set_security_IDs([ua.UserNamePasswordUserPolicy(), ua.X509UserPolicy()])
+        # Setup user identity tokens (X.509 certificates, username/password as fallback)
+        server.set_identity_tokens([ua.X509IdentityToken, ua.UserNameIdentityToken])
         
         self.logger.info("Security setup completed")
         return server
     
+    def _read_server_credentials(self) -> Tuple[bytes, bytes]:
+        """Generate the server certificate if needed and return the certificate and key bytes"""
+        cert_file, key_file = generate_self_signed_certificate(
+            cert_dir="../../opcua-server-sim/certs",
+            server_name="OPCUA-Simulation-Server"
+        )
+        return Path(cert_file).read_bytes(), Path(key_file).read_bytes()
+    
     async def create_dynamic_nodes(self):
         """Create OPC UA nodes dynamically from configuration"""
         self.logger.info("Creating dynamic nodes from configuration...")
@@ -94,46 +146,93 @@ class OPCUASimulationServer:
         # Create objects folder for simulation
         objects = self.server.get_objects_node()
         
+        # (node, text) pairs; all descriptions are set with one Write request once the nodes exist
+        descriptions = []
+        
         for site in self.config.sites:
             for asset in site.assets:
                 # Create asset object
                 asset_node = await objects.add_object(idx, asset.asset_name)
-                await asset_node.set_attribute(ua.AttributeIds.Description, asset.description or "")
+                descriptions.append((asset_node, asset.description or ""))
                 
-                # Create variables for each mapped tag
-                for tag_name, node_id in asset.node_mapping.items():
-                    # Determine variable type based on tag name
-                    variant_type = self._get_variant_type(tag_name)
-                    
-                    # Create variable
-                    var_node = await asset_node.add_variable(idx, tag_name, 0.0, variant_type)
-                    await var_node.set_attribute(ua.AttributeIds.Description, f"Simulated {tag_name}")
-                    
-                    # Make variable writable for some tags
-                    if tag_name in ["MachineState"]:
-                        await var_node.set_writable()
+                # Determine variable types based on tag names
+                tag_names = list(asset.node_mapping)
+                variant_types = [self._get_variant_type(tag_name) for tag_name in tag_names]
+                
+                # Create the asset's variables concurrently, initialised with a zero value of their declared type
+                var_nodes = await asyncio.gather(*(
+                    asset_node.add_variable(idx, tag_name, _VARIANT_CASTS[variant_type](), variant_type)
+                    for tag_name, variant_type in zip(tag_names, variant_types)
+                ))
+                descriptions.extend(
+                    (var_node, f"Simulated {tag_name}") for var_node, tag_name in zip(var_nodes, tag_names)
+                )
+                
+                # Make variable writable for some tags
+                await asyncio.gather(*(
+                    var_node.set_writable()
+                    for var_node, tag_name in zip(var_nodes, tag_names)
+                    if tag_name in ["MachineState"]
+                ))
+                
+                for tag_name, variant_type, var_node in zip(tag_names, variant_types, var_nodes):
+                    # WriteValue reused by every batched write of this variable
+                    write_value = ua.WriteValue()
+                    write_value.NodeId = var_node.nodeid
+                    write_value.AttributeId = ua.AttributeIds.Value
                     
                     # Store reference for simulation
                     self.node_variables[f"{asset.asset_name}.{tag_name}"] = {
                         'node': var_node,
                         'type': variant_type,
                         'asset': asset,
-                        'tag': tag_name
+                        'tag': tag_name,
+                        'generator': self._select_generator(tag_name, asset),
+                        'source_tag': self._get_energy_source_tag(tag_name, asset),
+                        'write_value': write_value,
+                        'last_value': 0.0,  # Last simulated value; cumulative tags build on it without a read
+                        'written_value': _VARIANT_CASTS[variant_type](),  # Value the node currently holds
+                        'min_delta': next((delta for key, delta in _MIN_DELTAS.items() if key in tag_name), 0.0)
                     }
                     
-                    self.logger.info(f"Created variable: {asset.asset_name}.{tag_name}")
+                    # Per-variable detail is debug output; skip formatting it unless debug logging is on
+                    if self.logger.isEnabledFor(logging.DEBUG):
+                        self.logger.debug(f"Created variable: {asset.asset_name}.{tag_name}")
+        
+        await self._write_descriptions(descriptions)
+        
+        # Resolve each variable's sibling tags once, so generators look up related values by tag name
+        for var_info in self.node_variables.values():
+            asset = var_info['asset']
+            var_info['related'] = {
+                tag_name: self.node_variables[f"{asset.asset_name}.{tag_name}"]
+                for tag_name in asset.node_mapping
+            }
         
         self.logger.info(f"Created {len(self.node_variables)} dynamic variables")
     
+    async def _write_descriptions(self, descriptions: List[Tuple[Any, str]]):
+        """Set the Description attribute of many nodes with a single Write request"""
+        params = ua.WriteParameters()
+        for node, text in descriptions:
+            write_value = ua.WriteValue()
+            write_value.NodeId = node.nodeid
+            write_value.AttributeId = ua.AttributeIds.Description
+            write_value.Value = ua.DataValue(ua.Variant(ua.LocalizedText(text)))
+            params.NodesToWrite.append(write_value)
+        
+        results = await self.server.iserver.isession.write(params)
+        for (node, _), status in zip(descriptions, results):
+            if not status.is_good():
+                self.logger.error(f"Failed to set description of {node.nodeid.to_string()}: {status.name}")
+    
     def _get_variant_type(self, tag_name: str) -> ua.VariantType:
         """Determine OPC UA variant type based on tag name"""
-        tag_lower = tag_name.lower()
-        
-        if any(keyword in tag_lower for keyword in ['voltage', 'current', 'power', 'energy', 'frequency', 'efficiency', 'irradiance', 'soc', 'thd']):
+        if _DOUBLE_TAG_RE.search(tag_name):
             return ua.VariantType.Double
-        elif any(keyword in tag_lower for keyword in ['count', 'cycle']):
+        elif _UINT32_TAG_RE.search(tag_name):
             return ua.VariantType.UInt32
-        elif any(keyword in tag_lower for keyword in ['state', 'status']):
+        elif _STRING_TAG_RE.search(tag_name):
             return ua.VariantType.String
         else:
             return ua.VariantType.Double
@@ -142,229 +241,327 @@ class OPCUASimulationServer:
         """Main simulation loop for realistic data generation"""
         self.logger.info("Starting data simulation...")
         
+        # Changed variables are written with one Write request per tick instead of one per variable
+        variables = list(self.node_variables.items())
+        params = ua.WriteParameters()
+        session = self.server.iserver.isession
+        
+        # Ticks follow a monotonic deadline so the cadence doesn't drift by the time each tick takes
+        loop = asyncio.get_running_loop()
+        interval = 1.0  # Update every second
+        next_tick = loop.time()
+        
+        # Failed writes are counted and summarised at most once a minute rather than logged per variable per tick
+        log_interval = 60.0
+        next_failure_log = next_tick
+        failed_writes = 0
+        last_failure = None
+        
         while True:
             try:
-                current_time = time.time()
+                # Hour of day (UTC) driving the daily cycles, computed once for every variable
+                hour_of_day = (time.time() % 86400) / 3600
+                
+                # Value generation is pure Python; run it in a worker thread so the event loop
+                # stays free for client traffic (handshake crypto releases the GIL meanwhile)
+                changed = await asyncio.to_thread(self._compute_values, variables, hour_of_day)
+                
+                if changed:
+                    params.NodesToWrite = [var_info['write_value'] for _, var_info in changed]
+                    results = await session.write(params)
+                    for (var_key, _), status in zip(changed, results):
+                        if not status.is_good():
+                            failed_writes += 1
+                            last_failure = f"{var_key}: {status.name}"
                 
-                for var_key, var_info in self.node_variables.items():
-                    value = await self._generate_simulated_value(var_key, var_info, current_time)
-                    await var_info['node'].write_value(value)
+                if failed_writes and loop.time() >= next_failure_log:
+                    self.logger.error(f"Failed {failed_writes} simulated write(s), latest {last_failure}")
+                    failed_writes = 0
+                    next_failure_log = loop.time() + log_interval
                 
-                await asyncio.sleep(1.0)  # Update every second
+                next_tick += interval
+                now = loop.time()
+                if now > next_tick:
+                    # Overran: drop the missed slots instead of bursting to catch up
+                    missed = int((now - next_tick) // interval) + 1
+                    self.logger.warning(f"Simulation tick overran, skipping {missed} tick(s)")
+                    next_tick += missed * interval
+                await asyncio.sleep(next_tick - now)
                 
             except Exception as e:
                 self.logger.error(f"Error in simulation loop: {e}")
                 await asyncio.sleep(5.0)
+                next_tick = loop.time()
     
-    async def _generate_simulated_value(self, var_key: str, var_info: Dict, current_time: float) -> Any:
-        """Generate realistic simulated values for energy equipment"""
-        tag_name = var_info['tag']
-        asset = var_info['asset']
-        
-        # Solar inverter voltage simulation (3-phase, 400V nominal)
+    def _compute_values(self, variables: List[Tuple[str, Dict]], hour_of_day: float) -> List[Tuple[str, Dict]]:
+        """Generate one tick of values and stage the changed ones on their variable's WriteValue"""
+        # Every value of a tick shares one (immutable) source timestamp
+        timestamp = datetime.now(timezone.utc)
+        changed = []
+        
+        for var_key, var_info in variables:
+            value = var_info['generator'](var_key, var_info, hour_of_day)
+            # Write with the variable's declared type; an inferred type (e.g. Int64 for 10) is rejected
+            variant_type = var_info['type']
+            value = var_info['last_value'] = _VARIANT_CASTS[variant_type](value)
+            
+            # Skip values the node already holds, or that moved less than the tag's minimum delta
+            written = var_info['written_value']
+            min_delta = var_info['min_delta']
+            if value == written or (min_delta and abs(value - written) < min_delta):
+                continue
+            
+            # The DataValue is new each tick: the server stores it by reference, so mutating
+            # last tick's object would change the stored value without a data change event
+            var_info['written_value'] = value
+            var_info['write_value'].Value = ua.DataValue(
+                ua.Variant(value, variant_type),
+                SourceTimestamp=timestamp
+            )
+            changed.append((var_key, var_info))
+        
+        return changed
+    
+    def _select_generator(self, tag_name: str, asset: AssetConfiguration) -> Callable[[str, Dict, float], Any]:
+        """Pick the simulation routine for a tag once, when its node is created"""
         if 'Voltage_L' in tag_name:
-            nominal_voltage = 400.0 / 1.732  # Phase voltage for 400V 3-phase
-            variation = random.uniform(-5, 5)  # ±5% variation
-            harmonic_distortion = random.uniform(-2, 2)
-            return nominal_voltage + variation + harmonic_distortion
-        
-        # Solar inverter current simulation (proportional to irradiance)
+            return self._sim_phase_voltage
         elif 'Current_L' in tag_name:
-            base_current = 720.0  # Approximate current for 500kW at 400V
-            irradiance_factor = 0.3 + 0.7 * (0.5 + 0.5 * (current_time % 86400) / 43200)  # Day/night cycle
-            variation = random.uniform(-10, 10)
-            return max(0, base_current * irradiance_factor + variation)
-        
-        # Solar active power simulation (kW, follows irradiance)
+            return self._sim_phase_current
         elif 'Power_Active' in tag_name:
-            base_power = 500.0  # 500kW inverter
-            # Realistic daily solar generation curve
-            hour_of_day = (current_time % 86400) / 3600
-            if 6 <= hour_of_day <= 18:  # Daylight hours
-                solar_factor = 0.9 * (1 - ((hour_of_day - 12) / 6) ** 2)  # Parabolic curve
-            else:
-                solar_factor = 0.0
-            cloud_cover = random.uniform(0.8, 1.0)  # Random cloud cover
-            return base_power * solar_factor * cloud_cover
-        
-        # Solar reactive power simulation (kVAR)
+            return self._sim_solar_power
         elif 'Power_Reactive' in tag_name:
-            active_power = await self._get_related_value(var_key, 'Power_Active', current_time)
-            power_factor = random.uniform(0.95, 0.99)
-            return active_power * (1 - power_factor) / power_factor
-        
-        # Solar energy total simulation (kWh, cumulative)
-        elif 'Energy_Total' in tag_name:
-            current_value = await var_info['node'].read_value()
-            if isinstance(current_value, (int, float)):
-                power_kw = await self._get_related_value(var_key, 'Power_Active', current_time)
-                increment = power_kw / 3600  # kWh per second
-                return current_value + increment
-            return 0.0
-        
-        # Grid frequency simulation (Hz)
+            return self._sim_reactive_power
+        elif any(energy_tag in tag_name for energy_tag in _ENERGY_SOURCE_TAGS):
+            return self._sim_energy_counter
         elif 'Frequency' in tag_name:
-            nominal_freq = 50.0
-            grid_stability = random.uniform(-0.1, 0.1)
-            return nominal_freq + grid_stability
-        
-        # Solar inverter efficiency simulation (%)
+            return self._sim_frequency
         elif 'Efficiency' in tag_name:
-            base_efficiency = 96.0
-            load_factor = random.uniform(0.8, 1.0)
-            temperature_derating = random.uniform(-2, 0)
-            return base_efficiency * load_factor + temperature_derating
-        
-        # Solar irradiance simulation (W/m²)
+            return self._sim_efficiency
         elif 'Irradiance' in tag_name:
-            hour_of_day = (current_time % 86400) / 3600
-            if 6 <= hour_of_day <= 18:
-                base_irradiance = 800 * (1 - ((hour_of_day - 12) / 6) ** 2)
-                cloud_factor = random.uniform(0.7, 1.0)
-                return base_irradiance * cloud_factor
-            else:
-                return 0.0
-        
-        # Battery voltage simulation (V)
+            return self._sim_irradiance
         elif 'Voltage' in tag_name and 'Battery' in asset.asset_name:
-            base_voltage = 800.0  # 800V battery system
-            soc_factor = random.uniform(0.95, 1.05)
-            return base_voltage * soc_factor
-        
-        # Battery current simulation (A, positive for charge, negative for discharge)
+            return self._sim_battery_voltage
         elif 'Current' in tag_name and 'Battery' in asset.asset_name:
-            if 'Power_Charge' in asset.node_mapping:
-                charge_power = await self._get_related_value(var_key, 'Power_Charge', current_time)
-                discharge_power = await self._get_related_value(var_key, 'Power_Discharge', current_time)
-                net_power = discharge_power - charge_power
-                return net_power / 800.0  # Current = Power/Voltage
-            return random.uniform(-100, 100)
-        
-        # Battery charge power simulation (kW)
+            return self._sim_battery_current
         elif 'Power_Charge' in tag_name:
-            base_charge = 200.0
-            solar_excess = random.uniform(0, 1)  # Solar excess available
-            return base_charge * solar_excess
-        
-        # Battery discharge power simulation (kW)
+            return self._sim_charge_power
         elif 'Power_Discharge' in tag_name:
-            base_discharge = 250.0
-            demand_factor = random.uniform(0, 1)  # Grid demand
-            return base_discharge * demand_factor
-        
-        # Battery State of Charge simulation (%)
+            return self._sim_discharge_power
         elif 'SoC' in tag_name:
-            current_value = await var_info['node'].read_value()
-            if isinstance(current_value, (int, float)):
-                charge_power = await self._get_related_value(var_key, 'Power_Charge', current_time)
-                discharge_power = await self._get_related_value(var_key, 'Power_Discharge', current_time)
-                net_power = charge_power - discharge_power
-                soc_change = (net_power / 1000.0) / 3600  # SoC change per second
-                new_soc = current_value + soc_change
-                return max(10, min(90, new_soc))  # Limit between 10% and 90%
-            return 50.0
-        
-        # Battery temperature simulation (°C)
+            return self._sim_soc
         elif 'Temperature_Cell' in tag_name:
-            base_temp = 25.0
-            current = await self._get_related_value(var_key, 'Current', current_time)
-            heating = abs(current) * 0.02  # Temperature rise due to current
-            ambient = random.uniform(15, 30)
-            return base_temp + heating + ambient - 20
-        
-        # Ambient temperature simulation (°C)
+            return self._sim_cell_temperature
         elif 'Temperature_Ambient' in tag_name:
-            hour_of_day = (current_time % 86400) / 3600
-            daily_cycle = 10 * (0.5 - 0.5 * (hour_of_day - 14) / 10)
-            base_temp = 20.0
-            return base_temp + daily_cycle + random.uniform(-2, 2)
-        
-        # Battery health index simulation (%)
+            return self._sim_ambient_temperature
         elif 'Health_Index' in tag_name:
-            current_value = await var_info['node'].read_value()
-            if isinstance(current_value, (int, float)):
-                degradation = 0.0001  # Very slow degradation
-                return max(80, current_value - degradation)
-            return 98.0
-        
-        # Smart meter power import simulation (kW)
+            return self._sim_health_index
         elif 'Power_Import' in tag_name:
-            base_load = 300.0  # 300kW commercial load
-            time_factor = 1.0 + 0.3 * (0.5 - 0.5 * ((current_time % 86400) / 3600 - 12) / 12)
-            return base_load * time_factor + random.uniform(-20, 20)
-        
-        # Smart meter power export simulation (kW)
+            return self._sim_power_import
         elif 'Power_Export' in tag_name:
-            solar_generation = 400.0 * (0.5 + 0.5 * (current_time % 86400) / 43200)
-            building_load = await self._get_related_value(var_key, 'Power_Import', current_time)
-            net_export = max(0, solar_generation - building_load)
-            return net_export
-        
-        # Energy cumulative counters
-        elif any(keyword in tag_name for keyword in ['Energy_Total', 'Energy_Import_Total', 'Energy_Export_Total', 'Energy_Charged', 'Energy_Discharged']):
-            current_value = await var_info['node'].read_value()
-            if isinstance(current_value, (int, float)):
-                # Find corresponding power value
-                power_tag = tag_name.replace('Energy_Total', 'Power_Total').replace('Energy_Import_Total', 'Power_Import').replace('Energy_Export_Total', 'Power_Export').replace('Energy_Charged', 'Power_Charge').replace('Energy_Discharged', 'Power_Discharge')
-                power_value = await self._get_related_value(var_key, power_tag, current_time)
-                increment = abs(power_value) / 3600 if power_value else 0
-                return current_value + increment
-            return 0.0
-        
-        # Power factor simulation
+            return self._sim_power_export
         elif 'Power_Factor' in tag_name:
-            return random.uniform(0.95, 0.99)
-        
-        # Total harmonic distortion simulation (%)
+            return self._sim_power_factor
         elif 'THD' in tag_name:
-            return random.uniform(2, 5)  # 2-5% THD is typical
-        
-        # Load panel power simulation (kW)
+            return self._sim_thd
         elif 'Power_Total' in tag_name and 'Load' in asset.asset_name:
-            base_load = 250.0
-            time_factor = 1.0 + 0.4 * (0.5 - 0.5 * ((current_time % 86400) / 3600 - 14) / 10)
-            return base_load * time_factor + random.uniform(-15, 15)
-        
-        # Equipment state simulation
+            return self._sim_load_power
         elif any(keyword in tag_name for keyword in ['Inverter_State', 'Battery_State', 'Meter_State', 'Panel_State']):
-            states = ["Running", "Standby", "Fault", "Maintenance"]
-            weights = [0.85, 0.10, 0.03, 0.02]
-            return random.choices(states, weights=weights)[0]
-        
-        # Cycle count simulation (incrementing counter)
+            return self._sim_equipment_state
         elif 'Cycle_Count' in tag_name:
-            current_value = await var_info['node'].read_value()
-            if isinstance(current_value, (int, float)):
-                increment = random.randint(0, 1)  # Battery cycles are slow
-                return int(current_value) + increment
-            return 0
-        
-        # Temperature simulation (general)
+            return self._sim_cycle_count
         elif 'Temperature' in tag_name and 'Battery' not in asset.asset_name:
-            base_temp = 35.0
-            daily_cycle = 15 * (0.5 - 0.5 * (current_time % 86400) / 43200)
-            return base_temp + daily_cycle + random.uniform(-3, 3)
-        
-        # Default simulation
+            return self._sim_temperature
         else:
-            return random.uniform(0, 100)
+            return self._sim_default
     
-    async def _get_related_value(self, var_key: str, related_tag: str, current_time: float) -> float:
-        """Get value from a related tag for simulation consistency"""
-        # Find the related variable
-        asset_name = var_key.split('.')[0]
-        related_key = f"{asset_name}.{related_tag}"
-        
-        if related_key in self.node_variables:
-            related_var = self.node_variables[related_key]
-            try:
-                value = await related_var['node'].read_value()
-                return float(value) if isinstance(value, (int, float)) else 0.0
-            except:
-                pass
-        
-        # Return a default value if related tag not found
-        return 0.0
+    def _get_energy_source_tag(self, tag_name: str, asset: AssetConfiguration) -> Optional[str]:
+        """Power tag a cumulative energy tag integrates, or None if the asset has none"""
+        for energy_tag, power_tags in _ENERGY_SOURCE_TAGS.items():
+            if energy_tag in tag_name:
+                return next((power_tag for power_tag in power_tags if power_tag in asset.node_mapping), None)
+        return None
+    
+    def _sim_phase_voltage(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Solar inverter voltage simulation (3-phase, 400V nominal)"""
+        nominal_voltage = _PHASE_VOLTAGE
+        variation = _uniform(-5, 5)  # ±5% variation
+        harmonic_distortion = _uniform(-2, 2)
+        return nominal_voltage + variation + harmonic_distortion
+    
+    def _sim_phase_current(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Solar inverter current simulation (proportional to irradiance)"""
+        base_current = 720.0  # Approximate current for 500kW at 400V
+        irradiance_factor = 0.3 + 0.7 * (0.5 + 0.5 * hour_of_day / 12)  # Day/night cycle
+        variation = _uniform(-10, 10)
+        return max(0, base_current * irradiance_factor + variation)
+    
+    def _sim_solar_power(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Solar active power simulation (kW, follows irradiance)"""
+        base_power = 500.0  # 500kW inverter
+        # Realistic daily solar generation curve
+        if 6 <= hour_of_day <= 18:  # Daylight hours
+            solar_factor = 0.9 * (1 - ((hour_of_day - 12) / 6) ** 2)  # Parabolic curve
+        else:
+            solar_factor = 0.0
+        cloud_cover = _uniform(0.8, 1.0)  # Random cloud cover
+        return base_power * solar_factor * cloud_cover
+    
+    def _sim_reactive_power(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Solar reactive power simulation (kVAR)"""
+        active_power = self._get_related_value(var_info, 'Power_Active')
+        power_factor = _uniform(0.95, 0.99)
+        return active_power * (1 - power_factor) / power_factor
+    
+    def _sim_frequency(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Grid frequency simulation (Hz)"""
+        nominal_freq = 50.0
+        grid_stability = _uniform(-0.1, 0.1)
+        return nominal_freq + grid_stability
+    
+    def _sim_efficiency(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Solar inverter efficiency simulation (%)"""
+        base_efficiency = 96.0
+        load_factor = _uniform(0.8, 1.0)
+        temperature_derating = _uniform(-2, 0)
+        return base_efficiency * load_factor + temperature_derating
+    
+    def _sim_irradiance(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Solar irradiance simulation (W/m²)"""
+        if 6 <= hour_of_day <= 18:
+            base_irradiance = 800 * (1 - ((hour_of_day - 12) / 6) ** 2)
+            cloud_factor = _uniform(0.7, 1.0)
+            return base_irradiance * cloud_factor
+        else:
+            return 0.0
+    
+    def _sim_battery_voltage(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Battery voltage simulation (V)"""
+        base_voltage = 800.0  # 800V battery system
+        soc_factor = _uniform(0.95, 1.05)
+        return base_voltage * soc_factor
+    
+    def _sim_battery_current(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Battery current simulation (A, positive for charge, negative for discharge)"""
+        asset = var_info['asset']
+        if 'Power_Charge' in asset.node_mapping:
+            charge_power = self._get_related_value(var_info, 'Power_Charge')
+            discharge_power = self._get_related_value(var_info, 'Power_Discharge')
+            net_power = discharge_power - charge_power
+            return net_power / 800.0  # Current = Power/Voltage
+        return _uniform(-100, 100)
+    
+    def _sim_charge_power(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Battery charge power simulation (kW)"""
+        base_charge = 200.0
+        solar_excess = _uniform(0, 1)  # Solar excess available
+        return base_charge * solar_excess
+    
+    def _sim_discharge_power(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Battery discharge power simulation (kW)"""
+        base_discharge = 250.0
+        demand_factor = _uniform(0, 1)  # Grid demand
+        return base_discharge * demand_factor
+    
+    def _sim_soc(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Battery State of Charge simulation (%)"""
+        current_value = var_info['last_value']
+        if isinstance(current_value, (int, float)):
+            charge_power = self._get_related_value(var_info, 'Power_Charge')
+            discharge_power = self._get_related_value(var_info, 'Power_Discharge')
+            net_power = charge_power - discharge_power
+            soc_change = (net_power / 1000.0) / 3600  # SoC change per second
+            new_soc = current_value + soc_change
+            return max(10, min(90, new_soc))  # Limit between 10% and 90%
+        return 50.0
+    
+    def _sim_cell_temperature(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Battery temperature simulation (°C)"""
+        base_temp = 25.0
+        current = self._get_related_value(var_info, 'Current')
+        heating = abs(current) * 0.02  # Temperature rise due to current
+        ambient = _uniform(15, 30)
+        return base_temp + heating + ambient - 20
+    
+    def _sim_ambient_temperature(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Ambient temperature simulation (°C)"""
+        daily_cycle = 10 * (0.5 - 0.5 * (hour_of_day - 14) / 10)
+        base_temp = 20.0
+        return base_temp + daily_cycle + _uniform(-2, 2)
+    
+    def _sim_health_index(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Battery health index simulation (%)"""
+        current_value = var_info['last_value']
+        if isinstance(current_value, (int, float)):
+            degradation = 0.0001  # Very slow degradation
+            return max(80, current_value - degradation)
+        return 98.0
+    
+    def _sim_power_import(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Smart meter power import simulation (kW)"""
+        base_load = 300.0  # 300kW commercial load
+        time_factor = 1.0 + 0.3 * (0.5 - 0.5 * (hour_of_day - 12) / 12)
+        return base_load * time_factor + _uniform(-20, 20)
+    
+    def _sim_power_export(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Smart meter power export simulation (kW)"""
+        solar_generation = 400.0 * (0.5 + 0.5 * hour_of_day / 12)
+        building_load = self._get_related_value(var_info, 'Power_Import')
+        net_export = max(0, solar_generation - building_load)
+        return net_export
+    
+    def _sim_energy_counter(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Energy cumulative counters (kWh, integrating the source power tag)"""
+        source_tag = var_info['source_tag']
+        power_value = self._get_related_value(var_info, source_tag) if source_tag else 0.0
+        return var_info['last_value'] + abs(power_value) / 3600  # kWh per second
+    
+    def _sim_power_factor(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Power factor simulation"""
+        return _uniform(0.95, 0.99)
+    
+    def _sim_thd(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Total harmonic distortion simulation (%)"""
+        return _uniform(2, 5)  # 2-5% THD is typical
+    
+    def _sim_load_power(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Load panel power simulation (kW)"""
+        base_load = 250.0
+        time_factor = 1.0 + 0.4 * (0.5 - 0.5 * (hour_of_day - 14) / 10)
+        return base_load * time_factor + _uniform(-15, 15)
+    
+    def _sim_equipment_state(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Equipment state simulation"""
+        # One draw against precomputed thresholds; random.choices rebuilds them on every call
+        return _EQUIPMENT_STATES[bisect.bisect(_EQUIPMENT_STATE_CUM_WEIGHTS, _random())]
+    
+    def _sim_cycle_count(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Cycle count simulation (incrementing counter)"""
+        current_value = var_info['last_value']
+        if isinstance(current_value, (int, float)):
+            increment = _randint(0, 1)  # Battery cycles are slow
+            return int(current_value) + increment
+        return 0
+    
+    def _sim_temperature(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Temperature simulation (general)"""
+        base_temp = 35.0
+        daily_cycle = 15 * (0.5 - 0.5 * hour_of_day / 12)
+        return base_temp + daily_cycle + _uniform(-3, 3)
+    
+    def _sim_default(self, var_key: str, var_info: Dict, hour_of_day: float) -> Any:
+        """Default simulation"""
+        return _uniform(0, 100)
+    
+    def _get_related_value(self, var_info: Dict, related_tag: str) -> float:
+        """Get the latest simulated value of a related tag for simulation consistency"""
+        # Related variables of the same asset were resolved at node creation
+        related_var = var_info['related'].get(related_tag)
+        if related_var is None:
+            return 0.0  # Related tag not configured on this asset
+        
+        value = related_var['last_value']
+        return float(value) if isinstance(value, (int, float)) else 0.0
     
     async def start(self):
         """Start the OPC UA server"""
@@ -388,12 +585,13 @@ class OPCUASimulationServer:
             
             self.logger.info("Server fully operational with simulation running")
             
-            # Keep server running
+            # Keep server running until a shutdown signal arrives
+            self._install_signal_handlers()
             try:
-                while True:
-                    await asyncio.sleep(3600)  # Check every hour
+                await self._stop_event.wait()
             except asyncio.CancelledError:
-                self.logger.info("Server shutdown requested")
+                pass
+            self.logger.info("Server shutdown requested")
                 
         except Exception as e:
             self.logger.error(f"Failed to start server: {e}")
@@ -401,17 +599,32 @@ class OPCUASimulationServer:
         finally:
             await self.stop()
     
+    def _install_signal_handlers(self):
+        """Setup signal handlers for graceful shutdown on the running event loop"""
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self._handle_signal, signum)
+            except NotImplementedError:
+                # Not supported by the Windows event loops; Ctrl+C still raises KeyboardInterrupt
+                pass
+    
+    def _handle_signal(self, signum: int):
+        """Wake start() so it shuts the server down"""
+        self.logger.info(f"Received signal {signal.Signals(signum).name}, initiating shutdown...")
+        self._stop_event.set()
+    
     async def stop(self):
         """Stop the OPC UA server"""
         self.logger.info("Stopping OPC UA server...")
         
-        # Cancel simulation tasks
+        # Cancel all simulation tasks, then wait for them together
         for task in self.simulation_tasks:
             task.cancel()
-            try:
-                await task
-            except asyncio.CancelledError:
-                pass
+        for result in await asyncio.gather(*self.simulation_tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                self.logger.error(f"Error stopping simulation task: {result}")
+        self.simulation_tasks.clear()
         
         # Stop server
         if self.server:
@@ -435,4 +648,11 @@ async def main():
 
 
 if __name__ == "__main__":
+    # uvloop lowers per-write event-loop overhead; optional, not available on Windows
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     asyncio.run(main())